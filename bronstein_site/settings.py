@@ -164,3 +164,55 @@ DEFAULT_FROM_EMAIL = os.environ.get("DJANGO_DEFAULT_FROM_EMAIL", "no-reply@docte
 
 # Public URL for absolute links in emails/sitemaps
 SITE_URL = os.environ.get("DJANGO_SITE_URL", "https://www.docteur-bronstein-gastro.fr")
+
+# Chatbot
+# "bm25" (default) or "tfidf" (vectorized scoring, requires numpy)
+CHATBOT_RANKER = os.environ.get("DJANGO_CHATBOT_RANKER", "bm25")
+# Responses kept per worker for repeated questions (0 disables the cache)
+CHATBOT_CACHE_SIZE = int(os.environ.get("DJANGO_CHATBOT_CACHE_SIZE", "512"))
+# Maximum number of messages accepted by /api/chatbot/batch/ (staff only)
+CHATBOT_BATCH_LIMIT = int(os.environ.get("DJANGO_CHATBOT_BATCH_LIMIT", "50"))
+# Serve /api/chatbot/ with the async view (ASGI deployments), scoring on a pool of CHATBOT_WORKERS threads
+CHATBOT_ASYNC = os.environ.get("DJANGO_CHATBOT_ASYNC", "false").lower() == "true"
+CHATBOT_WORKERS = int(os.environ.get("DJANGO_CHATBOT_WORKERS", "4"))
+# Share of chatbot requests whose stage durations are logged and added to the histograms of /api/chatbot/stats/
+CHATBOT_TIMING_SAMPLE_RATE = float(os.environ.get("DJANGO_CHATBOT_TIMING_SAMPLE_RATE", "0.01"))
+# Index file of the static content (exams, pathologies, guides, PDFs) shared by the workers; empty disables it
+CHATBOT_INDEX_PATH = os.environ.get("DJANGO_CHATBOT_INDEX_PATH", str(BASE_DIR / "var" / "chatbot_index.bin"))
+# Log of the chatbot questions (normalized), scores and answers, for manage.py chatbot_unmatched: a .sqlite3/.db
+# database or a rotating JSON lines file, written in batches by a background thread; empty disables it
+CHATBOT_ANALYTICS_PATH = os.environ.get("DJANGO_CHATBOT_ANALYTICS_PATH", str(BASE_DIR / "var" / "chatbot_queries.sqlite3"))
+CHATBOT_ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("DJANGO_CHATBOT_ANALYTICS_FLUSH_INTERVAL", "5"))
+CHATBOT_ANALYTICS_BATCH_SIZE = int(os.environ.get("DJANGO_CHATBOT_ANALYTICS_BATCH_SIZE", "100"))
+# Records buffered per worker when the log cannot keep up (the next ones are dropped)
+CHATBOT_ANALYTICS_BUFFER_SIZE = int(os.environ.get("DJANGO_CHATBOT_ANALYTICS_BUFFER_SIZE", "10000"))
+# Size of a JSON lines file before rotation, and rotated files kept
+CHATBOT_ANALYTICS_MAX_BYTES = int(os.environ.get("DJANGO_CHATBOT_ANALYTICS_MAX_BYTES", str(10 * 1024 * 1024)))
+CHATBOT_ANALYTICS_BACKUPS = int(os.environ.get("DJANGO_CHATBOT_ANALYTICS_BACKUPS", "5"))
+# Days the questions of a SQLite log are kept (0 keeps them forever); a JSON lines log is bounded by its rotation
+CHATBOT_ANALYTICS_RETENTION_DAYS = float(os.environ.get("DJANGO_CHATBOT_ANALYTICS_RETENTION_DAYS", "90"))
+
+# OpenEvidence service of the chatbot's complementary answers; the canned answers are used when empty or unavailable
+OPENEVIDENCE_URL = os.environ.get("DJANGO_OPENEVIDENCE_URL", "")
+OPENEVIDENCE_API_KEY = os.environ.get("DJANGO_OPENEVIDENCE_API_KEY", "")
+OPENEVIDENCE_CONNECT_TIMEOUT = float(os.environ.get("DJANGO_OPENEVIDENCE_CONNECT_TIMEOUT", "1"))
+OPENEVIDENCE_READ_TIMEOUT = float(os.environ.get("DJANGO_OPENEVIDENCE_READ_TIMEOUT", "5"))
+# Requests in flight per worker (also the number of kept-alive connections); others get the canned answer
+OPENEVIDENCE_MAX_CONCURRENCY = int(os.environ.get("DJANGO_OPENEVIDENCE_MAX_CONCURRENCY", "4"))
+# Consecutive failures opening the circuit, and seconds before the service is tried again
+OPENEVIDENCE_FAILURE_THRESHOLD = int(os.environ.get("DJANGO_OPENEVIDENCE_FAILURE_THRESHOLD", "5"))
+OPENEVIDENCE_RESET_TIMEOUT = float(os.environ.get("DJANGO_OPENEVIDENCE_RESET_TIMEOUT", "30"))
+OPENEVIDENCE_CACHE_SIZE = int(os.environ.get("DJANGO_OPENEVIDENCE_CACHE_SIZE", "256"))
+# Threads waiting on the service for the async view, apart from the CHATBOT_WORKERS scoring pool
+OPENEVIDENCE_WORKERS = int(os.environ.get("DJANGO_OPENEVIDENCE_WORKERS", "2"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.chatbot": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
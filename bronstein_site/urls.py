@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.i18n import i18n_patterns
@@ -45,7 +46,13 @@ urlpatterns = [
     path("robots.txt", robots_txt),
     path('admin/', admin.site.urls),
     path('i18n/', include('django.conf.urls.i18n')),
-    path('api/chatbot/', core_views.chatbot_api, name='chatbot_api'),
+    path(
+        'api/chatbot/',
+        core_views.chatbot_async_api if settings.CHATBOT_ASYNC else core_views.chatbot_api,
+        name='chatbot_api',
+    ),
+    path('api/chatbot/batch/', core_views.chatbot_batch_api, name='chatbot_batch_api'),
+    path('api/chatbot/stats/', core_views.chatbot_stats, name='chatbot_stats'),
     path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="sitemap"),
 ]
 
@@ -0,0 +1 @@
+"""Search structures backing the site chatbot (``/api/chatbot/``)."""
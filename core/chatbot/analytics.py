@@ -0,0 +1,291 @@
+"""Write-behind log of the chatbot questions, to find the ones the site does not answer.
+
+Every answered message adds one record (time, normalized message, language,
+request type, top score, chosen answer, latency) to an in-memory buffer, so
+answering never waits for a write. A daemon thread of each worker flushes
+the buffer in batches every ``CHATBOT_ANALYTICS_FLUSH_INTERVAL`` seconds, or
+as soon as ``CHATBOT_ANALYTICS_BATCH_SIZE`` records are waiting, to
+``CHATBOT_ANALYTICS_PATH``:
+
+- a ``.sqlite3`` or ``.db`` path is a SQLite database (table
+  ``chatbot_queries``), kept apart from the site database so that its writes
+  never lock it. Several workers can share it. Records older than
+  ``CHATBOT_ANALYTICS_RETENTION_DAYS`` are deleted, at most once per
+  ``PRUNE_INTERVAL`` seconds per worker, when a batch is written.
+- any other path is a JSON lines file, rotated beyond
+  ``CHATBOT_ANALYTICS_MAX_BYTES`` with ``CHATBOT_ANALYTICS_BACKUPS`` older
+  files kept (``.1`` being the most recent). Use one file per worker.
+
+If the sink falls behind, the buffer stops at ``CHATBOT_ANALYTICS_BUFFER_SIZE``
+records and the next ones are dropped (and counted). Records still buffered
+are flushed at exit. ``manage.py chatbot_unmatched`` reports the questions
+most often left unanswered.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('time', 'query', 'lang', 'type', 'score', 'answer', 'target', 'latency_ms', 'cached')
+
+# Answers given when nothing on the site matched the question
+UNMATCHED_ANSWERS = ('fallback',)
+# Seconds between two deletions of the expired records of a SQLite log
+PRUNE_INTERVAL = 3600
+
+
+class JsonlSink:
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, records):
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.max_bytes and os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            if size and size + len(data) > self.max_bytes:
+                self.rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{number}"):
+                os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def read(self):
+        """Records of the backups (oldest first) then of the current file; unreadable lines are skipped."""
+        paths = [f"{self.path}.{number}" for number in range(self.backups, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+class SqliteSink:
+    TABLE = 'chatbot_queries'
+
+    def __init__(self, path, retention_days=90, prune_interval=PRUNE_INTERVAL):
+        self.path = path
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self.pruned = 0
+        self._last_prune = None
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            "time REAL, query TEXT, lang TEXT, type TEXT, score REAL, answer TEXT, target TEXT,"
+            " latency_ms REAL, cached INTEGER)"
+        )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_time ON {self.TABLE} (time)")
+        return connection
+
+    def write(self, records):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO {self.TABLE} ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                    [tuple(record[field] for field in FIELDS) for record in records],
+                )
+            now = time.time()
+            if self.retention_days and (self._last_prune is None or now - self._last_prune >= self.prune_interval):
+                self.prune(connection, now)
+        finally:
+            connection.close()
+
+    def prune(self, connection, now=None):
+        """Delete the records older than ``retention_days``; return how many were deleted."""
+        now = time.time() if now is None else now
+        with connection:
+            cursor = connection.execute(
+                f"DELETE FROM {self.TABLE} WHERE time < ?", (now - self.retention_days * 86400,),
+            )
+        self._last_prune = now
+        self.pruned += cursor.rowcount
+        return cursor.rowcount
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return
+        connection = self._connect()
+        try:
+            for row in connection.execute(f"SELECT {', '.join(FIELDS)} FROM {self.TABLE} ORDER BY time"):
+                record = dict(zip(FIELDS, row))
+                record['cached'] = bool(record['cached'])
+                yield record
+        finally:
+            connection.close()
+
+
+def get_sink(path, max_bytes=10 * 1024 * 1024, backups=5, retention_days=90):
+    if path.endswith(('.sqlite3', '.db')):
+        return SqliteSink(path, retention_days)
+    return JsonlSink(path, max_bytes, backups)
+
+
+class QueryLog:
+    """Buffer of query records, written in batches by a background thread."""
+
+    def __init__(self, sink, flush_interval=5.0, batch_size=100, max_buffer=10000):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.enabled = True
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, **fields):
+        """Buffer one record (missing fields are ``None``, ``time`` defaults to now)."""
+        if not self.enabled:
+            return
+        record = {field: fields.get(field) for field in FIELDS}
+        if record['time'] is None:
+            record['time'] = time.time()
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(record)
+            self.recorded += 1
+            pending = len(self._buffer)
+            # Threads do not survive a fork: each worker starts its own
+            if self._pid != os.getpid():
+                self._start()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        first = self._pid is None
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='chatbot-analytics', daemon=True)
+        self._thread.start()
+        if first:
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records now; return how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                records = list(self._buffer)
+                self._buffer.clear()
+            if not records:
+                return 0
+            try:
+                self.sink.write(records)
+            except (OSError, sqlite3.Error) as e:
+                self.errors += 1
+                self.dropped += len(records)
+                logger.warning("Erreur lors de l'écriture des statistiques du chatbot: %s", e)
+                return 0
+            self.written += len(records)
+            return len(records)
+
+    def stats(self):
+        return {
+            'sink': type(self.sink).__name__,
+            'path': self.sink.path,
+            'pruned': getattr(self.sink, 'pruned', None),
+            'pending': len(self._buffer),
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
+
+
+def analytics_sink():
+    """Sink of ``CHATBOT_ANALYTICS_PATH``, or ``None`` when analytics are disabled."""
+    path = getattr(settings, "CHATBOT_ANALYTICS_PATH", "")
+    if not path:
+        return None
+    return get_sink(
+        str(path),
+        max_bytes=getattr(settings, "CHATBOT_ANALYTICS_MAX_BYTES", 10 * 1024 * 1024),
+        backups=getattr(settings, "CHATBOT_ANALYTICS_BACKUPS", 5),
+        retention_days=getattr(settings, "CHATBOT_ANALYTICS_RETENTION_DAYS", 90),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_query_log():
+    """Query log of this process, or ``None`` when ``CHATBOT_ANALYTICS_PATH`` is empty."""
+    sink = analytics_sink()
+    if sink is None:
+        return None
+    return QueryLog(
+        sink,
+        flush_interval=getattr(settings, "CHATBOT_ANALYTICS_FLUSH_INTERVAL", 5.0),
+        batch_size=getattr(settings, "CHATBOT_ANALYTICS_BATCH_SIZE", 100),
+        max_buffer=getattr(settings, "CHATBOT_ANALYTICS_BUFFER_SIZE", 10000),
+    )
+
+
+def record_query(**fields):
+    log = get_query_log()
+    if log is not None:
+        log.record(**fields)
+
+
+def unmatched_queries(records, max_score=None):
+    """Count the unmatched questions of ``records``: ``{query: (count, last time, languages)}``.
+
+    A question is unmatched when the fallback answer was given or, with
+    ``max_score``, when its best score was below it.
+    """
+    counts = {}
+    for record in records:
+        if record.get('type') not in (None, 'normal') or not record.get('query'):
+            continue
+        score = record.get('score')
+        unmatched = record.get('answer') in UNMATCHED_ANSWERS or (
+            max_score is not None and score is not None and score < max_score
+        )
+        if not unmatched:
+            continue
+        count, last, languages = counts.get(record['query'], (0, 0, set()))
+        languages.add(record.get('lang'))
+        counts[record['query']] = (count + 1, max(last, record.get('time') or 0), languages)
+    return counts
@@ -0,0 +1,222 @@
+"""Offline latency and relevance benchmark of ``/api/chatbot/``.
+
+The benchmark index holds the real exams, pathologies and guides plus
+``size`` generated documents (blog posts and PDF pages written with the
+site's own vocabulary), so ranking costs and score dilution grow like they
+would with a large blog or RAG directory. The labelled queries of
+``benchmark_queries.json`` are replayed through ``chatbot_api`` with the
+response cache disabled; an answer is correct when its id (see
+``answer_id``) is one of the expected ids. Nothing is read from or written
+to the database.
+
+Run it with ``manage.py benchmark_chatbot``; ``benchmark_baseline.json``
+holds the accuracy and missed queries of the default sizes to compare with
+(``--baseline``). Latencies depend on the machine: they are reported, and
+only checked against an explicit ``--max-p95``.
+"""
+import json
+import os
+import random
+import re
+import statistics
+import time
+import tracemalloc
+from functools import lru_cache
+
+from .analytics import get_query_log
+from .cache import get_response_cache
+from .faq import get_faq_matcher
+from .index import InvertedIndex, SearchIndex, pinned_index
+from .language import RESPONSES
+from .sources import iter_exam_documents, iter_guide_documents, iter_pathology_documents
+from .text import tokenize
+
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_queries.json')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+# Link of the page suggested by a content answer
+PAGE_LINK = re.compile(r"<a href='([^']*)'>")
+
+# Share of the generated documents that are PDF pages, and pages per PDF
+PDF_SHARE = 0.3
+PDF_PAGES = 10
+
+
+def load_queries(path=QUERIES_PATH):
+    """Return ``[(message, expected answer ids)]``."""
+    with open(path, encoding='utf-8') as handle:
+        return [(item['message'], tuple(item['expected'])) for item in json.load(handle)]
+
+
+def site_documents():
+    yield from iter_exam_documents()
+    yield from iter_pathology_documents()
+    yield from iter_guide_documents()
+
+
+def synthetic_documents(size, seed=0):
+    """Yield ``size`` generated blog posts and PDF pages, reproducibly for a given ``seed``."""
+    rng = random.Random(seed)
+    vocabulary = sorted({token for doc in site_documents() for token in tokenize(doc['keywords'])})
+    # Zipf-like word frequencies, like real text
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    rng.shuffle(vocabulary)
+
+    pdf_count = int(size * PDF_SHARE)
+    for number in range(size - pdf_count):
+        title = " ".join(rng.choices(vocabulary, weights, k=rng.randint(3, 6))).capitalize()
+        yield {
+            'id': f"article:benchmark-{number}",
+            'type': 'article',
+            'title': title,
+            'url': f"/blog/benchmark-{number}/",
+            'keywords': f"{title} {' '.join(rng.choices(vocabulary, weights, k=rng.randint(150, 400)))}",
+        }
+    for number in range(pdf_count):
+        filename = f"benchmark_{number // PDF_PAGES}.pdf"
+        page = number % PDF_PAGES + 1
+        yield {
+            'id': f"document_pdf:{filename}#{page}",
+            'type': 'document_pdf',
+            'title': f"{filename} (p. {page})",
+            'url': f"/static/rag_documents/{filename}#page={page}",
+            'keywords': " ".join(rng.choices(vocabulary, weights, k=rng.randint(300, 600))),
+        }
+
+
+def benchmark_index(size, seed=0):
+    return SearchIndex(
+        {
+            'static': InvertedIndex(site_documents()),
+            'fixture': InvertedIndex(synthetic_documents(size, seed)),
+        },
+        version=('benchmark', size, seed),
+    )
+
+
+def percentile(values, percent):
+    """``percent``-th percentile of ``values`` (linear interpolation)."""
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+@lru_cache(maxsize=None)
+def faq_questions():
+    """``{answer: question}`` of the FAQs of every language."""
+    return {
+        entry.answer: entry.question
+        for lang in RESPONSES
+        for entry in get_faq_matcher(lang).entries
+    }
+
+
+def answer_id(response):
+    """URL of the suggested page, ``faq:<question>`` for an FAQ answer, ``greeting``, ``fallback`` or ``other``."""
+    match = PAGE_LINK.search(response)
+    if match:
+        return match.group(1)
+    question = faq_questions().get(response)
+    if question is not None:
+        return f"faq:{question}"
+    for responses in RESPONSES.values():
+        if response == responses['greeting']:
+            return 'greeting'
+        if response == responses['fallback']:
+            return 'fallback'
+    return 'other'
+
+
+def is_correct(response, expected):
+    return answer_id(response) in expected
+
+
+def run_benchmark(size, queries, repeat=3, seed=0):
+    """Build the index of ``size`` generated documents and replay ``queries`` ``repeat`` times.
+
+    Return a dict of measures: latencies in milliseconds, memory peaks in
+    megabytes (building the index, answering the queries once), top-1
+    accuracy and the missed queries.
+    """
+    from django.test import RequestFactory
+
+    from ..views import chatbot_api
+
+    start = time.perf_counter()
+    index = benchmark_index(size, seed)
+    # The spelling dictionary is part of the index, not of the first query
+    index.speller
+    build_ms = (time.perf_counter() - start) * 1000
+    # Memory is measured on separate runs: tracing slows Python down too much for timings
+    tracemalloc.start()
+    try:
+        benchmark_index(size, seed)
+        build_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    factory = RequestFactory()
+
+    def ask(message):
+        request = factory.post('/api/chatbot/', json.dumps({'message': message}), content_type='application/json')
+        return json.loads(chatbot_api(request).content)['response']
+
+    cache = get_response_cache()
+    maxsize, cache.maxsize = cache.maxsize, 0
+    cache.clear()
+    # Benchmark questions are not patient questions
+    query_log = get_query_log()
+    if query_log is not None:
+        recording, query_log.enabled = query_log.enabled, False
+    latencies, misses = [], []
+    try:
+        with pinned_index(index):
+            for round_number in range(repeat):
+                for message, expected in queries:
+                    start = time.perf_counter()
+                    answer = ask(message)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if round_number == 0 and not is_correct(answer, expected):
+                        misses.append((message, answer_id(answer)))
+
+            tracemalloc.start()
+            for message, _ in queries:
+                ask(message)
+            query_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        cache.maxsize = maxsize
+        if query_log is not None:
+            query_log.enabled = recording
+
+    return {
+        'size': size,
+        'documents': len(index),
+        'build_ms': build_ms,
+        'build_peak_mb': build_peak / 2 ** 20,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'query_peak_mb': query_peak / 2 ** 20,
+        'accuracy': (len(queries) - len(misses)) / len(queries) if queries else 0,
+        'misses': misses,
+    }
+
+
+def relevance(result):
+    """The machine independent measures of ``result``, as kept in the baseline."""
+    return {key: result[key] for key in ('size', 'documents', 'accuracy', 'misses')}
+
+
+def regressions(result, baseline):
+    """Messages describing how the relevance of ``result`` is worse than ``baseline`` (same size)."""
+    problems = []
+    if result['accuracy'] < baseline['accuracy']:
+        problems.append(f"accuracy {result['accuracy']:.1%} < baseline {baseline['accuracy']:.1%}")
+    missed_before = {message for message, _ in baseline['misses']}
+    for message, answer in result['misses']:
+        if message not in missed_before:
+            problems.append(f"{message!r} -> {answer}")
+    return problems
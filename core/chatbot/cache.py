@@ -0,0 +1,81 @@
+"""Bounded LRU cache of chatbot responses.
+
+Patients ask the same few questions over and over; their answers only
+change when the index does. Entries are keyed on ``(normalized message,
+language, request type)`` and tagged with the index ``version`` they were
+computed from: the whole cache is emptied as soon as a request sees another
+version (a blog post or a RAG PDF changed).
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class ResponseCache:
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.version = version
+
+    def get(self, key, version):
+        """Cached response for ``key``, or ``None``."""
+        with self._lock:
+            self._check_version(version)
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(response)
+
+    def put(self, key, response, version):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = dict(response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version': self.version,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_response_cache():
+    return ResponseCache(getattr(settings, "CHATBOT_CACHE_SIZE", 512))
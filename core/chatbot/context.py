@@ -0,0 +1,108 @@
+"""Context of a chatbot conversation, so that follow-ups need not repeat the subject.
+
+"Comment se passe une coloscopie ?" then "et pour la preparation ?": the
+second message names no exam, and on its own it matches every preparation
+page of the site. The exams and pathologies named in a message are
+recognized from their titles and ``ENTITY_ALIASES`` (on stems, so plurals
+match). The slug of the last one is returned to the widget as the
+``context`` of the answer, and the widget sends it back with the next
+message. A short message naming none but asking about an aspect of it
+(risks, treatment, preparation: the medical and OpenEvidence intents) is
+resolved against it: its name is appended to the message, and the site
+content considered is narrowed to the pages containing it.
+
+The server keeps nothing: any worker can answer the next message, and
+nothing is written while answering. Unknown slugs are ignored.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from .keywords import GREETING, get_intent_matcher
+from .lexicon import ENTITY_ALIASES
+from .phrases import title_parts
+from .stemming import stem
+from .text import tokenize
+
+
+# Messages with more meaningful words than this are new questions, not follow-ups
+FOLLOW_UP_MAX_WORDS = 4
+
+Entity = namedtuple('Entity', ['kind', 'slug', 'name'])
+
+
+class EntityMatcher:
+    """Exams and pathologies named in a message, recognized on stems (longest name first)."""
+
+    def __init__(self, entities, lang='fr'):
+        self.lang = lang
+        self.names = {}
+        self.entities = {}
+        for entity, names in entities:
+            self.entities[entity.slug] = entity
+            for name in names:
+                stems = tuple(stem(word, lang) for word in tokenize(name))
+                if stems:
+                    self.names.setdefault(stems, entity)
+        self.max_length = max(map(len, self.names), default=0)
+
+    def get(self, slug):
+        """Entity of ``slug``, or ``None``."""
+        return self.entities.get(slug)
+
+    def find(self, words):
+        """Entities named in the normalized ``words``, in order of appearance."""
+        stems = [stem(word, self.lang) for word in words]
+        found = []
+        i = 0
+        while i < len(stems):
+            for length in range(min(self.max_length, len(stems) - i), 0, -1):
+                entity = self.names.get(tuple(stems[i:i + length]))
+                if entity is not None:
+                    found.append(entity)
+                    i += length
+                    break
+            else:
+                i += 1
+        return found
+
+
+def _site_entities():
+    from ..views import EXAMS, PATHOLOGIES
+
+    for kind, items in (('exam', EXAMS), ('pathology', PATHOLOGIES)):
+        for item in items:
+            names = title_parts(item['title'])
+            names.extend(ENTITY_ALIASES.get(item['slug'], ()))
+            yield Entity(kind, item['slug'], names[0]), names
+
+
+@lru_cache(maxsize=None)
+def get_entity_matcher():
+    return EntityMatcher(_site_entities())
+
+
+def resolve_message(context, message, stop_words):
+    """Return ``(message, entity, context)`` for a normalized message sent with the ``context`` slug.
+
+    A follow-up (short, naming no exam or pathology, with a medical or
+    OpenEvidence intent) is returned with the name of the context's exam or
+    pathology appended, and that entity; other messages are returned
+    unchanged with ``None``. The returned context is the slug of the last
+    entity the message names, or else the valid slug it was sent with.
+    """
+    words = message.split()
+    matcher = get_entity_matcher()
+    entities = matcher.find(words)
+    if entities:
+        return message, None, entities[-1].slug
+
+    entity = matcher.get(context) if context else None
+    if entity is None:
+        return message, None, None
+    meaningful_words = [w for w in words if w not in stop_words and len(w) > 2]
+    if len(meaningful_words) > FOLLOW_UP_MAX_WORDS:
+        return message, None, entity.slug
+    # "ou se garer ?" is a new question, "et les risques ?" is about the entity
+    if not get_intent_matcher().categories(message) - {GREETING}:
+        return message, None, entity.slug
+    return f"{message} {entity.name}", entity, entity.slug
@@ -0,0 +1,48 @@
+"""Bounded thread pool running the chatbot scoring for the async view.
+
+Scoring is CPU-bound and reads the database (blog stamp), so under ASGI it
+must not run on the event loop. A dedicated pool of ``CHATBOT_WORKERS``
+threads bounds how many messages are scored at once; the other requests of
+the worker keep being served while a message waits for a thread.
+
+OpenEvidence requests mostly wait for the remote service: they run on their
+own smaller pool of ``OPENEVIDENCE_WORKERS`` threads, so a slow service
+never holds the scoring threads.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+@functools.lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "CHATBOT_WORKERS", 4),
+        thread_name_prefix="chatbot",
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_openevidence_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "OPENEVIDENCE_WORKERS", 2),
+        thread_name_prefix="openevidence",
+    )
+
+
+def _call(func, *args):
+    # Pool threads outlive requests: drop their stale database connections like request handlers do.
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_executor(func, *args, executor=None):
+    """Run ``func(*args)`` on ``executor`` (by default the chatbot pool) and return its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or get_executor(), functools.partial(_call, func, *args))
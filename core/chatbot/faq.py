@@ -0,0 +1,102 @@
+"""Compiled FAQ matchers, one per language.
+
+Everything that only depends on the static FAQ lists and word tables
+(normalized questions, their token sets and an inverted index with the term
+statistics used by the ranker) is computed once, so matching a message costs
+one pass over the message plus dictionary lookups.
+"""
+from functools import lru_cache
+
+from .index import InvertedIndex, SearchIndex, merge_terms
+from .language import get_profile
+from .ranking import get_ranker
+from .similarity import signature, similarity, upper_bound
+from .text import normalize_text
+
+
+# FAQs are curated answers: they outweigh site content matching the same words.
+FAQ_WEIGHT = 3
+# Share of the query words known to the FAQs (weighted) an FAQ must match to be chosen,
+# so that "comment se passe une coloscopie" is not answered by "Comment se passe le paiement ?"
+MIN_COVERAGE = 0.6
+# Questions worded like the message get up to SIMILARITY_WEIGHT extra points.
+SIMILARITY_THRESHOLD = 0.5
+SIMILARITY_WEIGHT = 30
+
+
+class CompiledFaq:
+    __slots__ = ('position', 'question', 'answer', 'normalized', 'words', 'signature')
+
+    def __init__(self, position, item):
+        self.position = position
+        self.question = item['q']
+        self.answer = item['a']
+        self.normalized = normalize_text(item['q'])
+        self.words = frozenset(self.normalized.split())
+        self.signature = signature(self.normalized)
+
+    def as_source(self):
+        return {'id': self.position, 'type': 'faq', 'title': self.question, 'url': '', 'keywords': self.question}
+
+
+def is_meaningful(word, stop_words):
+    return word not in stop_words and len(word) > 2
+
+
+class FaqMatcher:
+    """Score every FAQ of one language against a normalized message."""
+
+    def __init__(self, faqs, stop_words, synonyms, lang):
+        self.stop_words = stop_words
+        self.synonyms = synonyms
+        self.entries = [CompiledFaq(position, item) for position, item in enumerate(faqs)]
+        self.index = SearchIndex(
+            {'faq': InvertedIndex((entry.as_source() for entry in self.entries), lang=lang)}, lang=lang,
+        )
+
+    def query_words(self, words):
+        """Meaningful words of ``words`` and of their synonyms."""
+        return [w for w in self.synonyms.expand(words) if is_meaningful(w, self.stop_words)]
+
+    def best(self, user_message, ranker=None, speller=None):
+        """Return ``(entry, score)`` for the best FAQ, the first one winning ties.
+
+        ``speller`` is the site's shared spelling dictionary (see
+        ``SearchIndex.speller``), so a word of the site content is not
+        taken for a typo of an FAQ word.
+        """
+        ranker = ranker or get_ranker()
+        # Phrases are matched as a whole, the other words (and their synonyms) one by one,
+        # misspelled words being replaced by their closest FAQ words at a reduced weight
+        groups = self.index.message_terms(user_message.split(), self.query_words, speller)
+        total = sum(weight for weight, _ in groups)
+        ranked = {
+            document.doc_id: (score, matched)
+            for score, document, matched in ranker.rank(self.index, merge_terms(groups))
+        }
+        message_signature = signature(user_message, grow=False)
+
+        best_entry, best_score = None, 0
+        for entry in self.entries:
+            # 1. Word matches, weighted by term rarity and question length
+            score, matched = ranked.get(entry.position, (0, ()))
+            if total and sum(weight for weight, group in groups if any(term in matched for term in group)) < MIN_COVERAGE * total:
+                continue
+            score *= FAQ_WEIGHT
+
+            # 2. Sentence similarity, skipped when even a perfect overlap could not beat the best FAQ
+            bound = upper_bound(message_signature, entry.signature)
+            if bound > SIMILARITY_THRESHOLD and score + bound * SIMILARITY_WEIGHT > best_score:
+                ratio = similarity(message_signature, entry.signature)
+                if ratio > SIMILARITY_THRESHOLD:
+                    score += ratio * SIMILARITY_WEIGHT
+
+            if score > best_score:
+                best_entry, best_score = entry, score
+        return best_entry, best_score
+
+
+@lru_cache(maxsize=None)
+def get_faq_matcher(lang):
+    profile = get_profile(lang)
+    return FaqMatcher(profile.faqs, profile.stop_words, profile.synonyms, lang)
@@ -0,0 +1,166 @@
+"""Typo tolerance: a symmetric-delete (SymSpell) dictionary of the indexed vocabulary.
+
+Every word is stored under the strings obtained by deleting up to
+``MAX_DISTANCE`` characters of its first ``PREFIX_LENGTH`` characters. Two
+words within ``d`` edits of each other share such a delete, so a misspelled
+word only looks up its own deletes (a few dozen dictionary reads, whatever
+the vocabulary size) and verifies the handful of words found there with a
+bounded Levenshtein distance. Limiting deletes to a prefix keeps the
+dictionary to at most ~30 entries per word.
+
+Words are weighted by frequency (the number of documents containing them),
+and the most frequent of the closest words come first. A ``Speller`` wraps
+the dictionary of every corpus the chatbot searches: it leaves the words any
+of them knows alone and corrects the others to their single best match.
+"""
+# Largest number of edits tolerated (see ``max_typos``), and length of the word prefixes whose deletes are stored
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+
+def levenshtein(a, b, max_distance):
+    """Edit distance between ``a`` and ``b``, or ``max_distance + 1`` once it is known to exceed it."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > max_distance:
+        return max_distance + 1
+    # A common prefix or suffix does not change the distance, typos usually leave most of the word alone
+    start = 0
+    while start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not b:
+        return len(a) if len(a) <= max_distance else max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def max_typos(word):
+    """Number of edits tolerated for a word of this length."""
+    if len(word) < 5:
+        return 0
+    if len(word) < 9:
+        return 1
+    return 2
+
+
+def deletes(word, max_distance):
+    """``word`` and every string obtained by deleting up to ``max_distance`` of its characters."""
+    variants, frontier = {word}, {word}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class SpellingDictionary:
+    """Find the vocabulary words closest to a misspelled word, the most frequent first."""
+
+    def __init__(self, frequencies=(), max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.frequencies = {}
+        self.deletes = {}
+        for word, frequency in frequencies:
+            self.add(word, frequency)
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def __contains__(self, word):
+        return word in self.frequencies
+
+    def add(self, word, frequency=1):
+        if word in self.frequencies:
+            self.frequencies[word] += frequency
+            return
+        self.frequencies[word] = frequency
+        for variant in deletes(word[:self.prefix_length], self.max_distance):
+            self.deletes.setdefault(variant, []).append(word)
+
+    def closest(self, word, max_distance=None):
+        """Return ``(distance, words)`` for the vocabulary words closest to ``word`` (excluding ``word`` itself).
+
+        ``words`` is empty when nothing is within ``max_distance`` edits
+        (by default ``max_typos(word)``), and sorted by decreasing frequency.
+        """
+        if max_distance is None:
+            max_distance = max_typos(word)
+        max_distance = min(max_distance, self.max_distance)
+        if not max_distance:
+            return None, []
+
+        best, matches, seen = max_distance + 1, [], set()
+        for variant in deletes(word[:self.prefix_length], max_distance):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if candidate == word or abs(len(candidate) - len(word)) > max_distance:
+                    continue
+                distance = levenshtein(word, candidate, min(best, max_distance))
+                if distance > max_distance:
+                    continue
+                if distance < best:
+                    best, matches = distance, [candidate]
+                elif distance == best:
+                    matches.append(candidate)
+        matches.sort(key=lambda candidate: (-self.frequencies[candidate], candidate))
+        return (best, matches) if matches else (None, [])
+
+
+class Speller:
+    """Correct misspelled words against a vocabulary, the words of ``known`` being left alone.
+
+    With a ``base`` speller, the vocabulary is the base's plus ``frequencies``:
+    a small dictionary (the blog posts) can change without rebuilding the
+    base (the static pages and FAQs).
+    """
+
+    def __init__(self, frequencies=(), known=(), base=None):
+        self.base = base
+        self.dictionary = SpellingDictionary(frequencies)
+        self.known = set(known)
+        self.known.update(self.dictionary.frequencies)
+
+    def __contains__(self, word):
+        return word in self.known or (self.base is not None and word in self.base)
+
+    def frequency(self, word):
+        frequency = self.dictionary.frequencies.get(word, 0)
+        return frequency + self.base.frequency(word) if self.base is not None else frequency
+
+    def closest(self, word):
+        """Return ``(distance, words)`` like ``SpellingDictionary.closest``, over the base and this dictionary."""
+        best, words = self.dictionary.closest(word)
+        if self.base is None:
+            return best, words
+        base_best, base_words = self.base.closest(word)
+        if not words or (base_words and base_best < best):
+            best, words = base_best, base_words
+        elif base_words and base_best == best:
+            words = set(words).union(base_words)
+        return best, sorted(words, key=lambda candidate: (-self.frequency(candidate), candidate))
+
+    def correct(self, word):
+        """Closest vocabulary word to ``word`` (the most frequent on ties), or ``None`` if it is known or too far."""
+        if word in self:
+            return None
+        _, words = self.closest(word)
+        return words[0] if words else None
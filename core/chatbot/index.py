@@ -0,0 +1,545 @@
+"""Inverted index over the site content searched by the chatbot.
+
+The index is split in segments: the ``static`` segment holds exams,
+pathologies, guides and RAG PDFs and is loaded once per worker process (and
+reloaded when ``rag_stamp()`` shows that the PDF directory changed), the
+``blog`` segment holds published blog posts. The static segment is written to
+``CHATBOT_INDEX_PATH`` and memory-mapped by every worker (see
+``core.chatbot.storage``), so only the first worker after a content change
+parses the PDFs. Queries only touch the postings
+of their own tokens.
+
+The blog segment is updated one post at a time: ``core.signals`` calls
+``update_post``/``remove_post`` in the process that saved the post, and other
+processes notice the change through ``blog_stamp()`` and only re-tokenize the
+posts whose ``updated_at`` differs from the indexed version. Segments are
+never mutated in place once published to readers, updates swap in a copy.
+Every swap bumps the index ``version``, which lets callers cache results.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from ..models import BlogPost
+from ..rag_utils import load_pdf_content, rag_stamp
+from .fuzzy import Speller
+from .phrases import get_phrase_table
+from .sources import (
+    iter_exam_documents, iter_guide_documents, iter_pathology_documents, iter_static_documents,
+    post_document, post_document_id,
+)
+from .similarity import signature
+from .stemming import STEMMER_VERSION, stem
+from .text import normalize_text, tokenize
+
+
+logger = logging.getLogger(__name__)
+
+# Language of the site content, whose words are indexed by their French stems
+CONTENT_LANGUAGE = 'fr'
+# Weights of a known phrase of the query, as specific as its words together, and of its own words
+# ("prise de sang" is hardly about blood)
+PHRASE_WEIGHT = 2
+PHRASE_WORD_WEIGHT = 0.25
+
+
+def trigrams(text):
+    """Character trigrams of ``text`` (padded so short words still produce grams)."""
+    padded = f" {' '.join(text.split())} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Document:
+    """Metadata kept for an indexed document (the text itself is dropped)."""
+
+    __slots__ = ('doc_id', 'type', 'title', 'url', 'normalized_title', 'signature', 'length', 'terms', 'position')
+
+    def __init__(self, doc_id, type, title, url, length, terms, position=0):
+        self.doc_id = doc_id
+        self.type = type
+        self.title = title
+        self.url = url
+        self.normalized_title = normalize_text(title)
+        self.signature = signature(self.normalized_title)
+        self.length = length
+        self.terms = terms
+        self.position = position
+
+    @property
+    def title_grams(self):
+        return trigrams(self.normalized_title)
+
+    def __repr__(self):
+        return f"<Document {self.doc_id}>"
+
+
+class InvertedIndex:
+    """A single segment: ``token -> {doc_id: term count}`` postings.
+
+    Tokens are the stems (see ``core.chatbot.stemming``) of the words of the
+    documents, computed once when they are added, and the known phrases they
+    contain (see ``core.chatbot.phrases``).
+
+    Titles are also indexed by character trigram so that title similarity can
+    be checked on the few documents whose title looks like the query.
+    Structures derived from the postings (TF-IDF matrix) are built on first
+    use and dropped whenever the segment changes.
+    """
+
+    def __init__(self, documents=(), lang=CONTENT_LANGUAGE):
+        self.lang = lang
+        self.documents = {}
+        self.postings = {}
+        self.title_postings = {}
+        self.total_length = 0
+        self._next_position = 0
+        self._derived = {}
+        for doc in documents:
+            self.add(doc)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc):
+        """Index a source dict (see ``core.chatbot.sources``), replacing any previous version."""
+        self.remove(doc['id'])
+        self._derived = {}
+        tokens = [stem(token, self.lang) for token in tokenize(doc['keywords'])]
+        counts = Counter(tokens)
+        counts.update(get_phrase_table(self.lang).find(tokens))
+        document = Document(
+            doc['id'], doc['type'], doc['title'], doc['url'], len(tokens), tuple(counts), self._next_position,
+        )
+        self._next_position += 1
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[document.doc_id] = count
+        for gram in document.title_grams:
+            self.title_postings.setdefault(gram, set()).add(document.doc_id)
+        self.documents[document.doc_id] = document
+        self.total_length += document.length
+        return document
+
+    def remove(self, doc_id):
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return None
+        self._derived = {}
+        for token in document.terms:
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+        for gram in document.title_grams:
+            doc_ids = self.title_postings.get(gram)
+            if doc_ids is not None:
+                doc_ids.discard(doc_id)
+                if not doc_ids:
+                    del self.title_postings[gram]
+        self.total_length -= document.length
+        return document
+
+    def doc_freq(self, token):
+        return len(self.postings.get(token, ()))
+
+    def similar_titles(self, grams, min_shared):
+        """Ids of the documents whose title shares at least ``min_shared`` of ``grams``."""
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.title_postings.get(gram, ()))
+        return [doc_id for doc_id, count in shared.items() if count >= min_shared]
+
+    def derived(self, name, build):
+        """Return the structure ``name`` derived from this segment, building it with ``build(self)`` once."""
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = build(self)
+        return value
+
+    def copy(self):
+        """Copy the mutable structures so the original can keep serving reads."""
+        clone = self.__class__()
+        clone.lang = self.lang
+        clone.documents = dict(self.documents)
+        clone.postings = {token: dict(postings) for token, postings in self.postings.items()}
+        clone.title_postings = {gram: set(doc_ids) for gram, doc_ids in self.title_postings.items()}
+        clone.total_length = self.total_length
+        clone._next_position = self._next_position
+        return clone
+
+
+class BlogSegment(InvertedIndex):
+    """Segment of published posts, remembering the ``updated_at`` each post was indexed at."""
+
+    def __init__(self, posts=()):
+        self.versions = {}
+        super().__init__()
+        for post in posts:
+            self.add_post(post)
+
+    def add_post(self, post):
+        self.versions[post.pk] = post.updated_at
+        return self.add(post_document(post))
+
+    def remove_post(self, pk):
+        self.versions.pop(pk, None)
+        return self.remove(post_document_id(pk))
+
+    def copy(self):
+        clone = super().copy()
+        clone.versions = dict(self.versions)
+        return clone
+
+    def stale_posts(self):
+        """Return ``(changed_pks, removed_pks)`` compared to the published posts in the database."""
+        current = dict(BlogPost.objects.published().values_list('pk', 'updated_at'))
+        changed = [pk for pk, updated_at in current.items() if self.versions.get(pk) != updated_at]
+        removed = [pk for pk in self.versions if pk not in current]
+        return changed, removed
+
+
+def merge_terms(groups):
+    """Weights of the terms of ``message_terms`` groups, a term keeping its largest weight."""
+    weights = {}
+    for _, group in groups:
+        for term, weight in group.items():
+            weights[term] = max(weight, weights.get(term, 0))
+    return weights
+
+
+class SearchIndex:
+    """Read-only view over several named segments (indexed in the same ``lang``)."""
+
+    def __init__(self, segments, version=None, lang=CONTENT_LANGUAGE):
+        self.segments = segments
+        self.version = version
+        self.lang = lang
+
+    @property
+    def speller(self):
+        """Spelling dictionary shared with the FAQs (see ``get_speller``)."""
+        return get_speller(self.segments.values())
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments.values())
+
+    @property
+    def avg_length(self):
+        count = len(self)
+        return sum(segment.total_length for segment in self.segments.values()) / count if count else 0
+
+    def doc_freq(self, token):
+        return sum(segment.doc_freq(token) for segment in self.segments.values())
+
+    def __contains__(self, token):
+        return any(token in segment.postings for segment in self.segments.values())
+
+    def query_weights(self, words, typo_weight=0.5, speller=None, weight=1):
+        """Map the stems of query words to ``weight``, misspelled words being replaced by their best correction.
+
+        Words known to any corpus of ``speller`` (by default this index's)
+        or stop words are never corrected, even when this index lacks them.
+        """
+        speller = speller or self.speller
+        weights = {}
+        for word in words:
+            stemmed = stem(word, self.lang)
+            if stemmed in self:
+                weights[stemmed] = weight
+                continue
+            if word in speller:
+                continue
+            correction = speller.correct(stemmed)
+            if correction is not None and correction in self:
+                weights.setdefault(correction, typo_weight * weight)
+        return weights
+
+    def phrase_weights(self, words, weight=1):
+        """Weights of the indexed phrases found in the query ``words`` (normalized, stop words included)."""
+        return self.split_phrases(words, weight)[0]
+
+    def split_phrases(self, words, weight=1):
+        """Return the weights of the indexed phrases of the query ``words``, its other words and the phrase words."""
+        stems = [stem(word, self.lang) for word in words]
+        weights, covered = {}, set()
+        for term, start, end in get_phrase_table(self.lang).spans(stems):
+            covered.update(range(start, end))
+            if term in self:
+                weights[term] = weight
+        free = [word for position, word in enumerate(words) if position not in covered]
+        return weights, free, [words[position] for position in sorted(covered)]
+
+    def message_terms(self, words, terms, speller=None):
+        """Terms searched for a message of normalized ``words``, grouped by phrase or word: ``[(weight, {term: weight})]``.
+
+        ``terms`` maps a list of words to the meaningful words searched for
+        them (synonyms included). The words of a phrase only count for
+        ``PHRASE_WORD_WEIGHT``, so the phrase decides, even when this index
+        lacks it. Words this index does not know have no group.
+        """
+        phrases, free, covered = self.split_phrases(words, PHRASE_WEIGHT)
+        groups = [(weight, {term: weight}) for term, weight in phrases.items()]
+        for group_words, weight in ((covered, PHRASE_WORD_WEIGHT), (free, 1)):
+            for word in group_words:
+                group = self.query_weights(terms([word]), speller=speller, weight=weight)
+                if group:
+                    groups.append((weight, group))
+        return groups
+
+    def message_weights(self, words, terms, speller=None):
+        """Weights of the terms searched for a message (see ``message_terms``)."""
+        return merge_terms(self.message_terms(words, terms, speller))
+
+    @property
+    def vocabulary_size(self):
+        return len(set().union(*(segment.postings for segment in self.segments.values())))
+
+    def similar_titles(self, title, min_overlap=0.25):
+        """Documents whose title shares at least ``min_overlap`` of the character trigrams of ``title``."""
+        grams = trigrams(title)
+        min_shared = max(1, int(len(grams) * min_overlap))
+        return [
+            segment.documents[doc_id]
+            for segment in self.segments.values()
+            for doc_id in segment.similar_titles(grams, min_shared)
+        ]
+
+    def required_documents(self, segment, required):
+        """Ids of the documents of ``segment`` containing one of the ``required`` tokens."""
+        doc_ids = set()
+        for token in required:
+            doc_ids.update(segment.postings.get(token, ()))
+        return doc_ids
+
+    def search(self, tokens, title=None, min_title_overlap=0.25, required=None):
+        """Return ``[(Document, {token: count})]`` in index order.
+
+        A document is a candidate when it contains one of ``tokens`` or, if
+        ``title`` is given, when its title shares at least
+        ``min_title_overlap`` of the title's character trigrams. With
+        ``required``, only the documents also containing one of those tokens
+        are candidates.
+        """
+        tokens = set(tokens)
+        grams = trigrams(title) if title else ()
+        min_shared = max(1, int(len(grams) * min_title_overlap))
+        results = []
+        for rank, segment in enumerate(self.segments.values()):
+            matches = {}
+            for token in tokens:
+                for doc_id, count in segment.postings.get(token, {}).items():
+                    matches.setdefault(doc_id, {})[token] = count
+            if grams:
+                for doc_id in segment.similar_titles(grams, min_shared):
+                    matches.setdefault(doc_id, {})
+            if required is not None:
+                allowed = self.required_documents(segment, required)
+                matches = {doc_id: matched for doc_id, matched in matches.items() if doc_id in allowed}
+            for doc_id, matched in matches.items():
+                document = segment.documents[doc_id]
+                results.append(((rank, document.position), document, matched))
+        results.sort(key=lambda result: result[0])
+        return [(document, matched) for _, document, matched in results]
+
+
+def segment_frequencies(segments):
+    """``(word, document count)`` of the words of ``segments``, phrases left out."""
+    frequencies = Counter()
+    for segment in segments:
+        for token, postings in segment.postings.items():
+            if ' ' not in token:
+                frequencies[token] += len(postings)
+    return frequencies.items()
+
+
+def build_speller(segments):
+    """Speller over ``segments`` and the FAQs of every language; lexicon words are never corrected either."""
+    from .faq import get_faq_matcher
+    from .lexicon import PHRASES, STOP_WORDS, SYNONYMS
+
+    corpora = list(segments)
+    for lang in STOP_WORDS:
+        corpora.extend(get_faq_matcher(lang).index.segments.values())
+    known = set()
+    for lang, stop_words in STOP_WORDS.items():
+        words = set(stop_words)
+        words.update(word for pair in SYNONYMS.get(lang, ()) for word in pair)
+        words.update(word for phrase in PHRASES.get(lang, ()) for word in phrase.split())
+        known.update(words)
+        known.update(stem(word, lang) for word in words)
+    return Speller(segment_frequencies(corpora), known)
+
+
+# Spellers of the last segment sets. The blog segment is swapped on every post save, so its words
+# are a small speller layered on the one of the other segments, which is only rebuilt when they change
+SPELLER_CACHE_SIZE = 4
+_spellers = OrderedDict()
+_spellers_lock = threading.Lock()
+
+
+def _cached_speller(segments, build):
+    key = tuple(map(id, segments))
+    with _spellers_lock:
+        entry = _spellers.get(key)
+        # Ids can be reused once a segment is freed: the entry keeps its segments to compare them
+        if entry is None or any(a is not b for a, b in zip(entry[0], segments)):
+            entry = _spellers[key] = (segments, build())
+            while len(_spellers) > SPELLER_CACHE_SIZE:
+                _spellers.popitem(last=False)
+        _spellers.move_to_end(key)
+        return entry[1]
+
+
+def get_speller(segments):
+    """Shared speller of ``segments`` (see ``build_speller``), blog segments being layered on the others."""
+    segments = tuple(segments)
+    static = tuple(segment for segment in segments if not isinstance(segment, BlogSegment))
+    blog = tuple(segment for segment in segments if isinstance(segment, BlogSegment))
+    base = _cached_speller(static, lambda: build_speller(static))
+    if not blog:
+        return base
+    return _cached_speller(static + blog, lambda: Speller(segment_frequencies(blog), base=base))
+
+
+def build_static_segment():
+    return InvertedIndex(iter_static_documents())
+
+
+def static_stamp(pdf_stamp):
+    """Fingerprint of the static segment: exam/pathology/guide sources, PDF ``rag_stamp()``, stemmer and phrases."""
+    sources = [*iter_exam_documents(), *iter_pathology_documents(), *iter_guide_documents()]
+    phrases = list(get_phrase_table(CONTENT_LANGUAGE))
+    payload = json.dumps([sources, pdf_stamp, STEMMER_VERSION, phrases], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_static_segment(pdf_stamp, path=None):
+    """Static segment mapped from ``CHATBOT_INDEX_PATH``, (re)writing the file first if it is stale.
+
+    Falls back to an in-memory segment when no path is configured or the
+    file cannot be written.
+    """
+    from .storage import IndexFileError, MappedSegment, read_stamp, write_segment
+
+    path = path or getattr(settings, "CHATBOT_INDEX_PATH", None)
+    if not path:
+        return build_static_segment()
+    stamp = static_stamp(pdf_stamp)
+    if read_stamp(path) != stamp:
+        segment = build_static_segment()
+        try:
+            write_segment(segment, path, stamp)
+        except OSError as e:
+            logger.warning("Erreur lors de l'écriture de l'index du chatbot %s: %s", path, e)
+            return segment
+    try:
+        return MappedSegment(path)
+    except IndexFileError as e:
+        logger.warning("Erreur lors de la lecture de l'index du chatbot: %s", e)
+        return build_static_segment()
+
+
+def build_blog_segment():
+    return BlogSegment(BlogPost.objects.published())
+
+
+def blog_stamp():
+    """Cheap fingerprint of the blog table, changes when a post is added, edited or deleted."""
+    stats = BlogPost.objects.aggregate(count=Count('pk'), latest=Max('updated_at'))
+    return stats['count'], stats['latest']
+
+
+_lock = threading.Lock()
+_static_segment = None
+_blog_segment = None
+_blog_stamp = None
+_rag_stamp = None
+_version = 0
+_pinned_index = None
+
+
+def get_index():
+    """Return the worker's search index, building or refreshing segments as needed."""
+    global _static_segment, _blog_segment, _blog_stamp, _rag_stamp, _version
+
+    if _pinned_index is not None:
+        return _pinned_index
+    stamp = blog_stamp()
+    pdf_stamp = rag_stamp()
+    with _lock:
+        if _static_segment is None or pdf_stamp != _rag_stamp:
+            if _static_segment is not None:
+                load_pdf_content.cache_clear()
+            _static_segment = load_static_segment(pdf_stamp)
+            _version += 1
+        if _blog_segment is None:
+            _blog_segment = build_blog_segment()
+            _version += 1
+        elif stamp != _blog_stamp:
+            segment = _sync_blog_segment(_blog_segment)
+            if segment is not _blog_segment:
+                _blog_segment = segment
+                _version += 1
+        _blog_stamp = stamp
+        _rag_stamp = pdf_stamp
+        return SearchIndex({'static': _static_segment, 'blog': _blog_segment}, version=_version)
+
+
+def _sync_blog_segment(segment):
+    changed, removed = segment.stale_posts()
+    if not changed and not removed:
+        return segment
+    segment = segment.copy()
+    for pk in removed:
+        segment.remove_post(pk)
+    for post in BlogPost.objects.published().filter(pk__in=changed):
+        segment.add_post(post)
+    return segment
+
+
+def update_post(post):
+    """Re-index ``post`` (or drop it if it is no longer published) in this process."""
+    global _blog_segment, _version
+
+    with _lock:
+        if _blog_segment is None:
+            return
+        segment = _blog_segment.copy()
+        if post.status == BlogPost.Status.PUBLISHED and post.published_at is not None:
+            segment.add_post(post)
+        else:
+            segment.remove_post(post.pk)
+        _blog_segment = segment
+        _version += 1
+
+
+def remove_post(pk):
+    """Drop a deleted post from this process's index."""
+    global _blog_segment, _version
+
+    with _lock:
+        if _blog_segment is None or pk not in _blog_segment.versions:
+            return
+        segment = _blog_segment.copy()
+        segment.remove_post(pk)
+        _blog_segment = segment
+        _version += 1
+
+
+@contextmanager
+def pinned_index(index):
+    """Make ``get_index()`` return ``index``, without touching the database (benchmarks, replays)."""
+    global _pinned_index
+
+    previous, _pinned_index = _pinned_index, index
+    try:
+        yield index
+    finally:
+        _pinned_index = previous
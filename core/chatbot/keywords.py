@@ -0,0 +1,83 @@
+"""Multi-keyword detection (Aho-Corasick) for greetings and intent routing.
+
+All keyword lists are compiled into one automaton: a trie of the keywords
+whose failure links point to the longest suffix of the current prefix that is
+also a prefix of some keyword. The message is read once, character by
+character, and every occurrence of every keyword is reported with its
+category, whatever the number of keywords. Keywords match inside words (like
+the historical ``keyword in message`` tests) unless they are registered as
+whole words.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from .lexicon import GREETINGS, MEDICAL_KEYWORDS, OPENEVIDENCE_TOPICS
+
+
+Pattern = namedtuple('Pattern', ['keyword', 'category', 'whole_word'], defaults=(False,))
+Hit = namedtuple('Hit', ['start', 'end', 'keyword', 'category'])
+
+GREETING = 'greeting'
+MEDICAL = 'medical'
+
+
+class KeywordAutomaton:
+    def __init__(self, patterns):
+        self.transitions = [{}]
+        self.outputs = [[]]
+        for pattern in patterns:
+            pattern = Pattern(*pattern)
+            state = 0
+            for char in pattern.keyword:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = self.transitions[state][char] = len(self.transitions)
+                    self.transitions.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(pattern)
+
+        # Failure links, breadth-first so that shorter prefixes are resolved first
+        self.failures = [0] * len(self.transitions)
+        queue = list(self.transitions[0].values())
+        for state in queue:
+            for char, next_state in self.transitions[state].items():
+                failure = self.failures[state]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                self.failures[next_state] = self.transitions[failure].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.failures[next_state]]
+                queue.append(next_state)
+
+    def find(self, text):
+        """Yield a ``Hit`` for every keyword occurrence in ``text``, in order of end position."""
+        transitions, failures, outputs = self.transitions, self.failures, self.outputs
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(char, 0)
+            for pattern in outputs[state]:
+                start, end = position + 1 - len(pattern.keyword), position + 1
+                if pattern.whole_word and not is_whole_word(text, start, end):
+                    continue
+                yield Hit(start, end, pattern.keyword, pattern.category)
+
+    def categories(self, text):
+        """Set of the categories having at least one keyword in ``text``."""
+        return {hit.category for hit in self.find(text)}
+
+
+def is_whole_word(text, start, end):
+    # Normalized messages only keep word characters and whitespace (tabs and newlines included)
+    return (start == 0 or text[start - 1].isspace()) and (end == len(text) or text[end].isspace())
+
+
+@lru_cache(maxsize=None)
+def get_intent_matcher():
+    """Automaton over the greetings, the medical keywords and the OpenEvidence topics."""
+    patterns = [Pattern(word, GREETING, whole_word=True) for word in GREETINGS]
+    patterns.extend(Pattern(word, MEDICAL) for word in MEDICAL_KEYWORDS)
+    for topic, words in OPENEVIDENCE_TOPICS:
+        patterns.extend(Pattern(word, topic) for word in words)
+    return KeywordAutomaton(patterns)
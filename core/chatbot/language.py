@@ -0,0 +1,139 @@
+"""Language detection and per-language resources for the chatbot.
+
+The marker word lists are compiled into a single ``word -> languages`` map so
+a message is scored for every language in one pass over its words. Messages
+without any marker word fall back to character-trigram profiles learnt from
+each language's FAQs, and stay in French unless another language is clearly
+more likely. Single words (usually a medical term, often shared between
+languages) are too short to tell apart and stay in French.
+"""
+import math
+from collections import Counter, namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+from .lexicon import MARKERS, STOP_WORDS, SYNONYMS
+from .synonyms import SynonymGraph
+from .text import normalize_text, tokenize
+
+
+DEFAULT_LANGUAGE = 'fr'
+
+RESPONSES = {
+    'fr': {
+        'greeting': "Bonjour ! Comment puis-je vous aider ?",
+        'fallback': "Je ne suis pas sûr de comprendre. Vous pouvez nous contacter au 40 81 48 48 ou consulter notre page FAQ.",
+    },
+    'en': {
+        'greeting': "Hello! How can I help you?",
+        'fallback': "I'm not sure I understand. You can contact us at 40 81 48 48 or check our FAQ page.",
+    },
+    'es': {
+        'greeting': "¡Hola! ¿En qué puedo ayudarle?",
+        'fallback': "No estoy seguro de entender. Puede contactarnos al 40 81 48 48 o consultar nuestra página de preguntas frecuentes.",
+    },
+}
+
+# Average log-probability per trigram by which another language must beat
+# French before a message without marker words is switched away from French.
+NGRAM_MARGIN = 0.5
+
+LanguageProfile = namedtuple(
+    'LanguageProfile',
+    ['code', 'faqs', 'stop_words', 'synonyms', 'greeting_response', 'fallback_response'],
+)
+
+
+def message_grams(text):
+    padded = f" {' '.join(text.split())} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class LanguageDetector:
+    def __init__(self, markers, samples, default=DEFAULT_LANGUAGE):
+        self.default = default
+        self.languages = tuple(markers)
+        self.marker_languages = {}
+        for code, words in markers.items():
+            for word in words:
+                for token in tokenize(word):
+                    self.marker_languages.setdefault(token, set()).add(code)
+        self.marker_languages = {word: tuple(codes) for word, codes in self.marker_languages.items()}
+
+        # Add-one smoothed trigram log-probabilities, per language.
+        self.gram_logprobs = {}
+        self.unseen_logprob = {}
+        vocabulary = set()
+        counts = {code: Counter(message_grams(normalize_text(text))) for code, text in samples.items()}
+        for grams in counts.values():
+            vocabulary.update(grams)
+        for code, grams in counts.items():
+            total = sum(grams.values()) + len(vocabulary) + 1
+            self.gram_logprobs[code] = {gram: math.log((count + 1) / total) for gram, count in grams.items()}
+            self.unseen_logprob[code] = math.log(1 / total)
+
+    def marker_scores(self, words):
+        scores = dict.fromkeys(self.languages, 0)
+        for word in words:
+            for code in self.marker_languages.get(word, ()):
+                scores[code] += 1
+        return scores
+
+    def ngram_scores(self, words):
+        grams = message_grams(' '.join(words))
+        if not grams:
+            return dict.fromkeys(self.languages, 0)
+        return {
+            code: sum(self.gram_logprobs[code].get(gram, self.unseen_logprob[code]) for gram in grams) / len(grams)
+            for code in self.languages
+        }
+
+    def detect(self, words):
+        """Language code of a message given as normalized words."""
+        scores = self.marker_scores(words)
+        best = max(scores, key=scores.get)
+        if scores[best]:
+            # A language wins only with strictly more markers than every other one.
+            if all(scores[best] > score for code, score in scores.items() if code != best):
+                return best
+            return self.default
+        if len(words) < 2:
+            return self.default
+
+        scores = self.ngram_scores(words)
+        best = max(scores, key=scores.get)
+        if best != self.default and scores[best] - scores[self.default] > NGRAM_MARGIN:
+            return best
+        return self.default
+
+
+def _faqs():
+    from ..views import FAQS_EN, FAQS_ES, FAQS_FR
+
+    return {'fr': FAQS_FR, 'en': FAQS_EN, 'es': FAQS_ES}
+
+
+@lru_cache(maxsize=None)
+def get_detector():
+    samples = {
+        code: " ".join(f"{item['q']} {item['a']}" for item in faqs)
+        for code, faqs in _faqs().items()
+    }
+    return LanguageDetector(MARKERS, samples)
+
+
+@lru_cache(maxsize=None)
+def get_profile(code):
+    return LanguageProfile(
+        code=code,
+        faqs=tuple(MappingProxyType(item) for item in _faqs()[code]),
+        stop_words=frozenset(STOP_WORDS[code]),
+        synonyms=SynonymGraph(SYNONYMS[code], code),
+        greeting_response=RESPONSES[code]['greeting'],
+        fallback_response=RESPONSES[code]['fallback'],
+    )
+
+
+def detect_language(words):
+    """Return the ``LanguageProfile`` of a message given as normalized words."""
+    return get_profile(get_detector().detect(words))
@@ -0,0 +1,363 @@
+"""Per-language word lists used by the chatbot to interpret patient messages.
+
+``MARKERS_*`` identify the language of a message, ``STOP_WORDS_*`` are
+ignored when matching and ``SYNONYMS_*`` list ``(patient wording, site
+wording)`` pairs linking the words of patients to the words used in the FAQs
+and site content (see ``core.chatbot.synonyms``). ``PHRASES_*`` are
+multi-word terms indexed as a whole (see ``core.chatbot.phrases``). The
+intent keywords at the end route messages (see ``core.chatbot.keywords``) and
+``ENTITY_ALIASES`` name the exams and pathologies followed across a
+conversation (see ``core.chatbot.context``).
+"""
+
+
+# French
+STOP_WORDS_FR = {
+    'le', 'la', 'les', 'de', 'du', 'des', 'un', 'une', 'est', 'il', 'elle', 'je', 'tu', 'nous', 'vous', 'ils', 'elles', 
+    'a', 'au', 'aux', 'ce', 'cette', 'ces', 'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses', 'notre', 'votre', 
+    'leur', 'leurs', 'que', 'qui', 'quoi', 'ou', 'quand', 'comment', 'pourquoi', 'quel', 'quelle', 'quels', 'quelles', 
+    'sur', 'sous', 'dans', 'par', 'pour', 'en', 'vers', 'avec', 'sans', 'y', 't', 'me', 'se', 'c', 'qu', 'j', 'l', 'n', 'd', 's', 'm',
+    'cest', 'quest', 'qu est', 'c est', 'sont', 'suis', 'es', 'sommes', 'etes', 'ete', 'etait', 'etaient',
+    'donne', 'moi', 'toi', 'lui', 'eux', 'ca', 'ceci', 'cela', 'faire', 'avoir', 'etre', 'aller', 'voir', 'savoir', 'pouvoir', 'vouloir', 'devoir', 'falloir',
+    'bonjour', 'merci', 'svp', 'plait', 'sil', 'te', 'se', 'nous', 'vous', 'ils', 'elles', 'on', 'en', 'y',
+    'numero', 'num', 'info', 'infos', 'information', 'informations', 'renseignement', 'renseignements',
+}
+
+MARKERS_FR = {
+    'le', 'les', 'des', 'du', 'au', 'aux',
+    'est', 'sont', 'suis', 'etes', 'etait', 'etaient',
+    'je', 'nous', 'vous', 'ils', 'elles', 'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses', 'notre', 'votre',
+    'quoi', 'comment', 'quand', 'pourquoi', 'quel', 'quelle', 'quels', 'quelles',
+    'dans', 'sur', 'sous', 'avec', 'sans', 'pour', 'par',
+    'bonjour', 'bonsoir', 'merci', 'rendez-vous', 'rdv', 'douleur', 'medecin', 'aide',
+    'ai', 'besoin', 'veux', 'voudrais'
+}
+
+SYNONYMS_FR = (
+    ("rdv", "rendez-vous"),
+    ("docteur", "medecin"),
+    ("dr", "medecin"),
+    ("prix", "paiement"),
+    ("tarif", "paiement"),
+    ("cout", "paiement"),
+    ("argent", "paiement"),
+    ("reglement", "paiement"),
+    ("manger", "jeun"),
+    ("boire", "jeun"),
+    ("repas", "jeun"),
+    ("nourriture", "jeun"),
+    ("alcool", "jeun"),
+    ("mal", "douleurs"),
+    ("bide", "abdominale"),
+    ("ventre", "abdominale"),
+    ("estomac", "abdominale"),
+    ("parking", "garer"),
+    ("stationnement", "garer"),
+    ("lait", "lactose"),
+    ("caca", "selles"),
+    ("popo", "selles"),
+    ("toilette", "selles"),
+    ("fesses", "anus"),
+    ("derriere", "anus"),
+    ("brulure", "reflux"),
+    ("remontee", "reflux"),
+    ("acide", "reflux"),
+    ("virus", "hepatite"),
+    ("contamination", "hepatite"),
+    ("mici", "crohn"),
+    ("rch", "rectocolite"),
+    ("alcool", "cirrhose"),
+    ("fibrose", "cirrhose"),
+    ("constipation", "manometrie"),
+    ("incontinence", "manometrie"),
+    ("heure", "horaires"),
+    ("ouverture", "horaires"),
+    ("fermeture", "horaires"),
+    ("telephone", "contacter"),
+    ("tel", "contacter"),
+    ("mail", "contacter"),
+    ("email", "contacter"),
+    ("joindre", "contacter"),
+    ("appeler", "contacter"),
+    # Anatomy
+    ("intestin", "abdominale"),
+    ("colon", "abdominale"),
+    ("foie", "hepatique"),
+    ("oesophage", "abdominale"),
+    ("gorge", "oesophage"),
+    ("rectum", "anus"),
+    ("bouche", "abdominale"),
+    # Symptoms - Pain/Discomfort
+    ("souffrance", "douleurs"),
+    ("bobo", "douleurs"),
+    ("crampe", "douleurs"),
+    ("spasme", "douleurs"),
+    ("picotement", "douleurs"),
+    ("lance", "douleurs"),
+    ("aigreur", "reflux"),
+    ("pyrosis", "reflux"),
+    ("regurgitation", "reflux"),
+    ("amer", "reflux"),
+    # Symptoms - Digestive
+    ("vomi", "vomissements"),
+    ("vomir", "vomissements"),
+    ("gerber", "vomissements"),
+    ("nausee", "vomissements"),
+    ("ecoeurement", "vomissements"),
+    ("sang", "saignement"),
+    ("saigne", "saignement"),
+    ("hemorragie", "saignement"),
+    ("rouge", "saignement"),
+    ("noir", "melena"),
+    ("goudron", "melena"),
+    ("diarrhee", "transit"),
+    ("chiasse", "transit"),
+    ("courante", "transit"),
+    ("liquide", "transit"),
+    ("eau", "transit"),
+    ("dur", "constipation"),
+    ("bloque", "constipation"),
+    ("coince", "constipation"),
+    ("bouche", "constipation"),
+    ("gaz", "ballonnements"),
+    ("pet", "ballonnements"),
+    ("rot", "ballonnements"),
+    ("ballonne", "ballonnements"),
+    ("gonfle", "ballonnements"),
+    ("air", "ballonnements"),
+    ("glouglou", "ballonnements"),
+    # General State
+    ("fatigue", "asthenie"),
+    ("epuise", "asthenie"),
+    ("creve", "asthenie"),
+    ("fievre", "temperature"),
+    ("chaud", "temperature"),
+    ("frisson", "temperature"),
+    ("maigrir", "poids"),
+    ("grossir", "poids"),
+    ("appetit", "faim"),
+    # Procedures
+    ("colo", "coloscopie"),
+    ("gastro", "gastroscopie"),
+    ("endo", "endoscopie"),
+    ("camera", "endoscopie"),
+    ("tuyau", "endoscopie"),
+    ("fibro", "gastroscopie"),
+    ("echo", "echographie"),
+    ("scan", "scanner"),
+    ("irm", "scanner"),
+    ("operation", "intervention"),
+    ("chirurgie", "intervention"),
+    ("bloc", "intervention"),
+    ("anesthesie", "dodo"),
+    ("dormir", "anesthesie"),
+    ("reveil", "anesthesie"),
+    ("sedation", "anesthesie"),
+    # Preparation
+    ("preparation", "prepa"),
+    ("purge", "prepa"),
+    ("sachet", "prepa"),
+    ("picoprep", "prepa"),
+    ("citrafleet", "prepa"),
+    ("moviprep", "prepa"),
+    ("colokit", "prepa"),
+    ("izinova", "prepa"),
+    ("kleanprep", "prepa"),
+    # Conditions
+    ("ulcere", "pathologie"),
+    ("tumeur", "pathologie"),
+    ("polype", "pathologie"),
+    ("kyste", "pathologie"),
+    ("diverticule", "pathologie"),
+    ("hernie", "pathologie"),
+    ("calcul", "lithiase"),
+    ("caillou", "lithiase"),
+    ("pierre", "lithiase"),
+    ("vesicule", "lithiase"),
+    ("gluten", "coeliaque"),
+    ("ble", "coeliaque"),
+    ("sucre", "intolerance"),
+    # Administrative
+    ("carte", "vitale"),
+    ("vitale", "assurance"),
+    ("mutuelle", "assurance"),
+    ("remboursement", "paiement"),
+    ("secu", "assurance"),
+    ("cps", "assurance"),
+    ("feuille", "papier"),
+    ("ordonnance", "prescription"),
+    ("papier", "document"),
+    ("arret", "travail"),
+    ("certificat", "document"),
+    ("lettre", "courrier"),
+    ("dossier", "document"),
+    # Urgency/Feelings
+    ("peur", "anxiete"),
+    ("stress", "anxiete"),
+    ("inquiet", "anxiete"),
+    ("angoisse", "anxiete"),
+    ("grave", "urgence"),
+    ("urgent", "urgence"),
+    ("vite", "urgence"),
+    ("maintenant", "urgence"),
+    ("secours", "urgence"),
+    ("aide", "urgence"),
+)
+
+# Administrative and medical terms only meaningful as a whole, besides pathology titles and symptom tags
+PHRASES_FR = (
+    "carte vitale",
+    "tiers payant",
+    "medecin traitant",
+    "compte rendu",
+    "prise de sang",
+    "bilan sanguin",
+    "a jeun",
+    "sans gluten",
+    "sans residu",
+    "intestin irritable",
+    "anesthesie generale",
+    "mal au ventre",
+)
+
+
+# English
+STOP_WORDS_EN = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'up', 'about', 'into', 'over', 'after',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'shall', 'should', 'can', 'could', 'may', 'might', 'must',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her', 'its', 'our', 'their', 'me', 'him', 'us', 'them',
+    'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how',
+    'this', 'that', 'these', 'those', 'here', 'there',
+    'please', 'thanks', 'thank', 'hello', 'hi'
+}
+
+MARKERS_EN = {
+    'the', 'this', 'that', 'these', 'those', 'with', 'for', 'from', 'about',
+    'you', 'your', 'my', 'mine', 'we', 'our', 'they', 'their',
+    'have', 'has', 'had', 'are', 'was', 'were', 'will', 'would', 'can', 'could', 'should',
+    'what', 'where', 'when', 'how', 'why', 'who', 'which',
+    'hello', 'hi', 'thanks', 'please', 'appointment', 'pain', 'doctor', 'help', 'morning', 'evening',
+    'do', 'does', 'did', 'is', 'am', 'need', 'want'
+}
+
+SYNONYMS_EN = (
+    ("rdv", "appointment"),
+    ("dr", "doctor"),
+    ("cost", "payment"),
+    ("price", "payment"),
+    ("pay", "payment"),
+    ("eat", "fasting"),
+    ("drink", "fasting"),
+    ("food", "fasting"),
+    ("meal", "fasting"),
+    ("hurt", "pain"),
+    ("ache", "pain"),
+    ("stomach", "abdominal"),
+    ("belly", "abdominal"),
+    ("location", "park"),
+    ("address", "park"),
+    ("parking", "park"),
+    ("poop", "stool"),
+    ("burn", "reflux"),
+    ("acid", "reflux"),
+    ("virus", "hepatitis"),
+    ("alcohol", "cirrhosis"),
+    ("open", "hours"),
+    ("close", "hours"),
+    ("time", "hours"),
+)
+
+
+# Spanish
+STOP_WORDS_ES = {
+    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'y', 'o', 'pero', 'si', 'no', 'en', 'a', 'de', 'del', 'al', 'por', 'para', 'con', 'sin', 'sobre',
+    'es', 'son', 'fue', 'fueron', 'ser', 'estar', 'estoy', 'estas', 'esta', 'estamos', 'estan', 'haber', 'hay', 'tener', 'tengo', 'tienes', 'tiene', 'tenemos', 'tienen',
+    'yo', 'tu', 'el', 'ella', 'nosotros', 'vosotros', 'ellos', 'ellas', 'mi', 'tu', 'su', 'nuestro', 'vuestro', 'me', 'te', 'le', 'nos', 'os', 'les',
+    'que', 'quien', 'donde', 'cuando', 'como', 'porque', 'cual', 'cuales',
+    'este', 'esta', 'estos', 'estas', 'ese', 'esa', 'esos', 'esas', 'aquel', 'aquella', 'aquellos', 'aquellas',
+    'hola', 'gracias', 'por favor'
+}
+
+MARKERS_ES = {
+    'el', 'los', 'las', 'un', 'una', 'unos', 'unas',
+    'es', 'son', 'fue', 'fueron', 'estoy', 'estas', 'esta', 'estamos', 'estan',
+    'yo', 'usted', 'nosotros', 'vosotros', 'ellos', 'ellas',
+    'que', 'como', 'donde', 'cuando', 'porque', 'quien', 'cual',
+    'por', 'para', 'con', 'del', 'al', 'sin',
+    'hola', 'gracias', 'cita', 'dolor', 'medico', 'ayuda', 'buenos', 'dias', 'tarde', 'noche',
+    'tengo', 'necesito', 'quiero'
+}
+
+SYNONYMS_ES = (
+    ("cita", "consulta"),
+    ("dr", "medico"),
+    ("doctor", "medico"),
+    ("precio", "pago"),
+    ("costo", "pago"),
+    ("pagar", "pago"),
+    ("comer", "ayunas"),
+    ("beber", "ayunas"),
+    ("comida", "ayunas"),
+    ("alimentos", "ayunas"),
+    ("doler", "dolor"),
+    ("estomago", "abdominal"),
+    ("barriga", "abdominal"),
+    ("direccion", "aparcar"),
+    ("ubicacion", "aparcar"),
+    ("estacionamiento", "aparcar"),
+    ("parking", "aparcar"),
+    ("caca", "heces"),
+    ("ardor", "reflujo"),
+    ("acidez", "reflujo"),
+    ("virus", "hepatitis"),
+    ("alcohol", "cirrosis"),
+    ("horas", "horarios"),
+    ("abierto", "horarios"),
+    ("cerrado", "horarios"),
+    ("tiempo", "horarios"),
+)
+
+
+# Intents (matched as substrings of the normalized message, greetings as whole words)
+GREETINGS = {'bonjour', 'salut', 'hello', 'bonsoir', 'hi', 'hola', 'buenos', 'dias'}
+
+MEDICAL_KEYWORDS = {
+    'maladie', 'traitement', 'symptome', 'douleur', 'cancer', 'examen', 'medicament', 'effets', 'risques',
+    'disease', 'treatment', 'symptom', 'pain', 'exam', 'drug', 'risk',
+    'enfermedad', 'tratamiento', 'sintoma', 'dolor', 'examen', 'riesgo',
+    'crohn', 'rch', 'rectocolite', 'hepatite', 'cirrhose', 'ulcere', 'polype', 'diverticule',
+    'coloscopie', 'gastroscopie', 'endoscopie'
+}
+
+# OpenEvidence topics, by priority
+OPENEVIDENCE_TOPICS = (
+    ('risk', ['risque', 'danger', 'complication', 'risk', 'perforation', 'hemorragie']),
+    ('treatment', ['traitement', 'soigner', 'medicament', 'treatment', 'guerir', 'aspirine', 'anticoagulant']),
+    ('exam', ['coloscopie', 'gastroscopie', 'endoscopie', 'examen', 'camera', 'polype']),
+    ('symptom', ['symptome', 'douleur', 'signe', 'symptom', 'mal', 'ventre']),
+    ('preparation', ['prepa', 'boire', 'manger', 'regime']),
+)
+
+# Everyday names of the exams and pathologies (by slug), besides the parts of their titles
+ENTITY_ALIASES = {
+    'gastroscopie': ['fibroscopie'],
+    'echo-endoscopie': ['echoendoscopie'],
+    'lithiase-biliaire': ['lithiase biliaire', 'calcul biliaire'],
+    'foie-gras': ['steatose'],
+    'maladie-crohn': ['crohn'],
+    'rch': ['rectocolite'],
+    'syndrome-intestin-irritable': ['intestin irritable', 'colopathie'],
+    'ulcere-gastrique': ['ulcere'],
+    'pancreatite-aigue': ['pancreatite'],
+    'cirrhose': ['cirrhose'],
+    'maladie-coeliaque': ['coeliaque'],
+    'diverticulose': ['diverticule'],
+    'polypes-colon': ['polype'],
+    'cancer-colon': ['cancer du colon'],
+}
+
+
+MARKERS = {'fr': MARKERS_FR, 'en': MARKERS_EN, 'es': MARKERS_ES}
+STOP_WORDS = {'fr': STOP_WORDS_FR, 'en': STOP_WORDS_EN, 'es': STOP_WORDS_ES}
+SYNONYMS = {'fr': SYNONYMS_FR, 'en': SYNONYMS_EN, 'es': SYNONYMS_ES}
+PHRASES = {'fr': PHRASES_FR}
@@ -0,0 +1,261 @@
+"""Complementary answers for the ``openevidence`` requests of the chatbot.
+
+``get_backend()`` returns the ``CannedBackend`` (fixed answers per topic)
+unless ``OPENEVIDENCE_URL`` is set, in which case answers are asked to that
+service by an ``HttpBackend``:
+
+- connections are kept alive in a small pool and reused across requests,
+- connecting and reading have their own strict timeouts,
+- at most ``OPENEVIDENCE_MAX_CONCURRENCY`` requests are in flight per worker,
+  the others are answered at once instead of waiting for a slot,
+- after ``OPENEVIDENCE_FAILURE_THRESHOLD`` consecutive failures the circuit
+  opens and the service is left alone for ``OPENEVIDENCE_RESET_TIMEOUT``
+  seconds, then one request probes it,
+- successful answers are cached.
+
+Protocol: ``POST {OPENEVIDENCE_URL}/v1/answer`` with the JSON body
+``{"question": ..., "topic": ...}`` (and ``Authorization: Bearer`` when
+``OPENEVIDENCE_API_KEY`` is set) returns ``{"answer": ...}``. The stand-in
+server of ``core.chatbot.openevidence_standin`` speaks it for local tests.
+
+``get_openevidence_answer()`` falls back to the canned answers whenever the
+service cannot answer, so patients always get a response.
+"""
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .cache import ResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+ANSWER_PATH = '/v1/answer'
+
+# Offline answers, by topic (None when no topic is recognized)
+OPENEVIDENCE_RESPONSES = {
+    None: "D'après les recommandations actuelles, ce sujet nécessite une évaluation clinique approfondie.",
+    'risk': "Les études montrent une incidence très faible de complications majeures (< 0.1%). Le rapport bénéfice/risque reste très favorable pour le dépistage.",
+    'treatment': "Les protocoles actuels préconisent une approche graduelle. Pour les traitements anticoagulants, un avis médical est indispensable avant tout acte endoscopique.",
+    'exam': "L'endoscopie est l'examen de référence pour explorer le tube digestif. Elle permet un diagnostic précis (visuel et biopsies) et parfois un traitement immédiat (ex: ablation de polypes).",
+    'symptom': "La présentation clinique peut être variable. L'examen clinique et l'endoscopie sont souvent nécessaires pour confirmer le diagnostic et exclure d'autres pathologies.",
+    'preparation': "La qualité de la préparation est le facteur prédictif le plus important pour la réussite de l'examen. Il est crucial de suivre le protocole à la lettre.",
+}
+
+
+class OpenEvidenceError(Exception):
+    """The service did not give a usable answer."""
+
+
+class OpenEvidenceUnavailable(OpenEvidenceError):
+    """The request was not sent (open circuit, too many requests in flight)."""
+
+
+class CannedBackend:
+    name = 'canned'
+    # Answers without any network call: cheap enough to prefetch with every streamed answer
+    local = True
+
+    def answer(self, question, topic=None):
+        return OPENEVIDENCE_RESPONSES.get(topic, OPENEVIDENCE_RESPONSES[None])
+
+    def stats(self):
+        return {'backend': self.name}
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to the host of ``url``, reused across requests."""
+
+    # A kept-alive connection closed by the server fails on reuse: retried once on a new connection
+    STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, url, size=4, connect_timeout=1.0, read_timeout=5.0):
+        parts = urlsplit(url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def _send(self, connection, method, path, body, headers):
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self._idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, data
+
+    def request(self, method, path, body=None, headers=None):
+        """Return ``(status, body)``; network errors and timeouts are raised (``OSError``, ``HTTPException``)."""
+        headers = headers or {}
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            return self._send(self._connect(), method, path, body, headers)
+        try:
+            return self._send(connection, method, path, body, headers)
+        except self.STALE_ERRORS:
+            return self._send(self._connect(), method, path, body, headers)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class CircuitBreaker:
+    """Stop calling a failing service for a while, then let one request probe it."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class HttpBackend:
+    name = 'http'
+    local = False
+
+    def __init__(self, url, api_key='', connect_timeout=1.0, read_timeout=5.0, max_concurrency=4,
+                 failure_threshold=5, reset_timeout=30.0, cache_size=256):
+        self.url = url
+        self.api_key = api_key
+        self.pool = ConnectionPool(url, max_concurrency, connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.cache = ResponseCache(cache_size)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.rejected = 0
+
+    def _post(self, question, topic):
+        body = json.dumps({'question': question, 'topic': topic}).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        try:
+            status, data = self.pool.request('POST', ANSWER_PATH, body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            self.breaker.failure()
+            raise OpenEvidenceError(f"{type(e).__name__}: {e}") from e
+        if status >= 500:
+            self.breaker.failure()
+            raise OpenEvidenceError(f"HTTP {status}")
+        # The service answered: a refused question does not make it unhealthy
+        self.breaker.success()
+        if status != 200:
+            raise OpenEvidenceError(f"HTTP {status}")
+        try:
+            answer = json.loads(data)['answer']
+        except (ValueError, KeyError, TypeError) as e:
+            raise OpenEvidenceError(f"Invalid response: {e}") from e
+        if not isinstance(answer, str) or not answer.strip():
+            raise OpenEvidenceError("Empty answer")
+        return answer
+
+    def answer(self, question, topic=None):
+        key = (question, topic)
+        cached = self.cache.get(key, self.url)
+        if cached is not None:
+            return cached['answer']
+
+        # Never wait for a slot: a slow service must not pile up blocked workers
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise OpenEvidenceUnavailable("Too many requests in flight")
+        try:
+            if not self.breaker.allow():
+                raise OpenEvidenceUnavailable("Circuit open")
+            answer = self._post(question, topic)
+        finally:
+            self._slots.release()
+        self.cache.put(key, {'answer': answer}, self.url)
+        return answer
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'url': self.url,
+            'circuit': self.breaker.state,
+            'failures': self.breaker.failures,
+            'rejected': self.rejected,
+            'cache': self.cache.stats(),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    url = getattr(settings, "OPENEVIDENCE_URL", "")
+    if not url:
+        return CannedBackend()
+    return HttpBackend(
+        url,
+        api_key=getattr(settings, "OPENEVIDENCE_API_KEY", ""),
+        connect_timeout=getattr(settings, "OPENEVIDENCE_CONNECT_TIMEOUT", 1.0),
+        read_timeout=getattr(settings, "OPENEVIDENCE_READ_TIMEOUT", 5.0),
+        max_concurrency=getattr(settings, "OPENEVIDENCE_MAX_CONCURRENCY", 4),
+        failure_threshold=getattr(settings, "OPENEVIDENCE_FAILURE_THRESHOLD", 5),
+        reset_timeout=getattr(settings, "OPENEVIDENCE_RESET_TIMEOUT", 30.0),
+        cache_size=getattr(settings, "OPENEVIDENCE_CACHE_SIZE", 256),
+    )
+
+
+def get_openevidence_answer(question, topic=None):
+    """Answer of the configured backend, or the canned answer of ``topic`` when it fails."""
+    try:
+        return get_backend().answer(question, topic)
+    except OpenEvidenceError as e:
+        logger.warning("OpenEvidence indisponible, réponse de secours utilisée: %s", e)
+        return CannedBackend().answer(question, topic)
@@ -0,0 +1,80 @@
+"""Local stand-in for the OpenEvidence service, for tests and development.
+
+It answers ``POST /v1/answer`` like the real service (see
+``core.chatbot.openevidence``) with the canned answer of the topic, and can
+be made slow (``delay``) or unreliable (``failure_rate``, answered with HTTP
+503) to exercise the timeouts and the circuit breaker. Connections are kept
+alive (HTTP/1.1). Run it with ``manage.py openevidence_standin``, or start
+one in a thread with ``start_standin()``.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .openevidence import ANSWER_PATH, CannedBackend
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (read timeout)
+            self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path != ANSWER_PATH:
+            self._reply(404, {'error': 'Not found'})
+            return
+        try:
+            data = json.loads(body)
+            question, topic = data['question'], data.get('topic')
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {'error': 'Invalid request'})
+            return
+
+        self.server.requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.failure_rate and random.random() < self.server.failure_rate:
+            self._reply(503, {'error': 'Unavailable'})
+            return
+        self._reply(200, {'answer': CannedBackend().answer(question, topic)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay=0.0, failure_rate=0.0, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.requests = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_standin(host='127.0.0.1', port=0, **options):
+    """Serve a ``StandInServer`` in a daemon thread (on a free port by default); stop it with ``shutdown()``."""
+    server = StandInServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name='openevidence-standin', daemon=True).start()
+    return server
@@ -0,0 +1,83 @@
+"""Known multi-word terms ("maladie de crohn", "prise de sang"), indexed as single terms.
+
+Split into words, such terms lose their meaning once stop words are dropped
+("prise de sang" becomes "prise" and "sang", both common in long blog posts
+and PDFs). The phrases of a language, taken from the pathology titles, the
+symptom tags and ``PHRASES_*`` in the lexicon, are compiled into a table of
+stem sequences. Every occurrence in a document is posted under the phrase
+(its stems joined by spaces) next to its words, and a message containing the
+phrase queries it too, so the ranker's rarity weighting rewards documents
+using the whole term without a positional scorer.
+"""
+import re
+from functools import lru_cache
+
+from .lexicon import PHRASES
+from .stemming import stem
+from .text import tokenize
+
+
+# Titles such as "Brûlures d'estomac / reflux" or "Rectocolite hémorragique (RCH)" hold several terms
+_TITLE_PARTS_RE = re.compile(r'[/()]')
+
+
+def title_parts(title):
+    """Terms of a title, normalized."""
+    return [" ".join(tokenize(part)) for part in _TITLE_PARTS_RE.split(title) if tokenize(part)]
+
+
+def title_phrases(title):
+    """Multi-word parts of a title."""
+    return [part for part in title_parts(title) if " " in part]
+
+
+class PhraseTable:
+    def __init__(self, phrases, lang):
+        self.lang = lang
+        self.phrases = {}
+        for text in phrases:
+            stems = tuple(stem(word, lang) for word in tokenize(text))
+            if len(stems) > 1:
+                self.phrases[stems] = " ".join(stems)
+        self.max_length = max(map(len, self.phrases), default=0)
+        self.first_words = {stems[0] for stems in self.phrases}
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def __iter__(self):
+        return iter(sorted(self.phrases.values()))
+
+    def spans(self, stems):
+        """``(term, start, end)`` of the phrases found in a sequence of stems, once per occurrence."""
+        found = []
+        for i in range(len(stems) - 1):
+            if stems[i] not in self.first_words:
+                continue
+            for length in range(2, min(self.max_length, len(stems) - i) + 1):
+                term = self.phrases.get(tuple(stems[i:i + length]))
+                if term is not None:
+                    found.append((term, i, i + length))
+        return found
+
+    def find(self, stems):
+        """Terms of the phrases found in a sequence of stems, once per occurrence."""
+        return [term for term, _, _ in self.spans(stems)]
+
+
+def _site_phrases():
+    from ..views import PATHOLOGIES, SYMPTOM_TAGS
+
+    for pathology in PATHOLOGIES:
+        yield from title_phrases(pathology['title'])
+    for label in SYMPTOM_TAGS:
+        yield from title_phrases(label)
+
+
+@lru_cache(maxsize=None)
+def get_phrase_table(lang):
+    """Phrases of ``lang``: the site content is French, other languages only have their lexicon phrases."""
+    phrases = list(PHRASES.get(lang, ()))
+    if lang == 'fr':
+        phrases.extend(_site_phrases())
+    return PhraseTable(phrases, lang)
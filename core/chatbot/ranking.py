@@ -0,0 +1,114 @@
+"""Ranking engines scoring chatbot candidates from precomputed term statistics.
+
+A ranker receives the index (for corpus statistics: document count, average
+length, document frequencies), the candidates returned by
+``SearchIndex.search`` and optional per-token query weights (typo
+corrections count less than exact words), and yields
+``(score, document, matched)`` in candidate order. ``rank`` combines
+retrieval and scoring and may be overridden by engines that do both at once
+(see ``core.chatbot.vectorized``).
+
+The engine is picked with the ``CHATBOT_RANKER`` setting.
+"""
+import heapq
+import logging
+import math
+from functools import lru_cache
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Ranker:
+    name = None
+
+    @classmethod
+    def available(cls):
+        """Whether the engine's optional dependencies are installed."""
+        return True
+
+    def score(self, index, candidates, weights=None):
+        raise NotImplementedError
+
+    def rank(self, index, weights, title=None, limit=None, required=None):
+        """Return ``[(score, document, matched)]``, best first (ties in index order).
+
+        With ``limit``, only the ``limit`` best word matches are kept, plus
+        the documents whose title looks like ``title``. With ``required``,
+        only the documents containing one of those tokens are ranked.
+        """
+        results = list(self.score(index, index.search(weights, title=title, required=required), weights))
+        if limit is not None and len(results) > limit:
+            kept = top_k(results, limit)
+            if title:
+                kept_ids = {document.doc_id for _, document, _ in kept}
+                similar = {document.doc_id for document in index.similar_titles(title)} - kept_ids
+                kept.extend(result for result in results if result[1].doc_id in similar)
+            results = kept
+        return sorted(results, key=lambda result: -result[0])
+
+
+class BM25Ranker(Ranker):
+    """Okapi BM25: rewards rare terms and dampens long documents."""
+
+    name = 'bm25'
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+    def idf(self, index, token):
+        doc_count = len(index)
+        doc_freq = index.doc_freq(token)
+        return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def score(self, index, candidates, weights=None):
+        weights = weights or {}
+        avg_length = index.avg_length or 1
+        idf = {}
+        for document, matched in candidates:
+            norm = self.k1 * (1 - self.b + self.b * document.length / avg_length)
+            score = 0
+            for token, count in matched.items():
+                if token not in idf:
+                    idf[token] = self.idf(index, token) * weights.get(token, 1)
+                score += idf[token] * count * (self.k1 + 1) / (count + norm)
+            yield score, document, matched
+
+
+RANKERS = {
+    BM25Ranker.name: BM25Ranker,
+}
+
+
+def register_ranker(cls):
+    RANKERS[cls.name] = cls
+    return cls
+
+
+def get_ranker():
+    return _build_ranker(getattr(settings, "CHATBOT_RANKER", BM25Ranker.name))
+
+
+@lru_cache(maxsize=None)
+def _build_ranker(name):
+    # Optional engines register themselves when their module is imported.
+    from . import vectorized  # noqa: F401
+
+    try:
+        ranker_class = RANKERS[name]
+    except KeyError as exc:
+        raise ValueError(f"Unknown chatbot ranker: {name!r}") from exc
+    if not ranker_class.available():
+        logger.warning("Erreur: le classement '%s' n'est pas disponible (dépendance manquante), BM25 est utilisé.", name)
+        ranker_class = BM25Ranker
+    return ranker_class()
+
+
+def top_k(results, k):
+    """Keep the ``k`` best ``(score, document, matched)`` results without sorting them all."""
+    # The position breaks ties in favour of the earliest candidate, like the historical strict ``>``.
+    best = heapq.nsmallest(k, enumerate(results), key=lambda item: (-item[1][0], item[0]))
+    return [result for _, result in best]
@@ -0,0 +1,74 @@
+"""Cheap sentence similarity between a message and FAQ questions or titles.
+
+Texts are reduced to their set of character trigrams, stored as a bit set
+(a Python int) over a shared trigram vocabulary. The similarity is the Dice
+coefficient ``2 * |A & B| / (|A| + |B|)``, which lives on the same 0-1 scale
+as ``difflib.SequenceMatcher.ratio()`` but costs one AND and one popcount.
+Since ``|A & B| <= min(|A|, |B|)``, ``upper_bound`` gives the best similarity
+two signatures could reach from their sizes alone, which lets callers skip
+candidates that cannot beat the current best.
+"""
+import threading
+
+
+class Signature:
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+
+class ShingleVocabulary:
+    """Assigns a bit to each character trigram seen in the indexed texts."""
+
+    def __init__(self):
+        self.bits = {}
+        self._lock = threading.Lock()
+
+    def shingles(self, text):
+        padded = f" {' '.join(text.split())} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def signature(self, text, grow=True):
+        """Signature of a normalized ``text``.
+
+        Indexed texts use ``grow=True`` to register their trigrams; queries
+        use ``grow=False`` so that unknown trigrams only count in the size.
+        """
+        shingles = self.shingles(text)
+        bits = 0
+        if grow:
+            with self._lock:
+                for shingle in shingles:
+                    bit = self.bits.get(shingle)
+                    if bit is None:
+                        bit = self.bits[shingle] = len(self.bits)
+                    bits |= 1 << bit
+        else:
+            for shingle in shingles:
+                bit = self.bits.get(shingle)
+                if bit is not None:
+                    bits |= 1 << bit
+        return Signature(bits, len(shingles))
+
+
+def similarity(a, b):
+    total = a.size + b.size
+    if not total:
+        return 0
+    return 2 * (a.bits & b.bits).bit_count() / total
+
+
+def upper_bound(a, b):
+    total = a.size + b.size
+    if not total:
+        return 0
+    return 2 * min(a.size, b.size) / total
+
+
+shingle_vocabulary = ShingleVocabulary()
+
+
+def signature(text, grow=True):
+    return shingle_vocabulary.signature(text, grow)
@@ -0,0 +1,113 @@
+"""Documents searched by the chatbot, gathered from the site content.
+
+Each source yields plain dicts with ``id``, ``type``, ``title``, ``url`` and
+``keywords`` (the text that gets indexed). The static lists live in
+``core.views`` and are imported lazily to avoid a circular import.
+"""
+from ..rag_utils import load_pdf_content
+from .timing import stage
+
+
+def _join(values):
+    return " ".join(values or [])
+
+
+def iter_exam_documents():
+    from ..views import EXAMS
+
+    for exam in EXAMS:
+        keywords = [
+            exam['title'],
+            exam.get('description', ''),
+            _join(exam.get('indications')),
+            exam.get('preparation', ''),
+            exam.get('procedure', ''),
+            exam.get('aftercare', ''),
+            _join(exam.get('risks')),
+        ]
+        yield {
+            'id': f"examen:{exam['slug']}",
+            'type': 'examen',
+            'title': exam['title'],
+            'url': f"/examens/{exam['slug']}",
+            'keywords': " ".join(keywords),
+        }
+
+
+def iter_pathology_documents():
+    from ..views import PATHOLOGIES
+
+    for path in PATHOLOGIES:
+        keywords = [
+            path['title'],
+            path.get('summary', ''),
+            _join(path.get('symptoms')),
+            _join(path.get('tags')),
+            _join(path.get('treatments')),
+            _join(path.get('advice')),
+            _join(path.get('prevention')),
+            _join(path.get('exams')),
+        ]
+        yield {
+            'id': f"pathologie:{path['slug']}",
+            'type': 'pathologie',
+            'title': path['title'],
+            'url': f"/pathologies/{path['slug']}",
+            'keywords': " ".join(keywords),
+        }
+
+
+def iter_guide_documents():
+    from ..views import GUIDES
+
+    for guide in GUIDES:
+        keywords = [
+            guide['title'],
+            guide.get('summary', ''),
+            _join(guide.get('steps')),
+        ]
+        yield {
+            'id': f"guide:{guide['slug']}",
+            'type': 'guide',
+            'title': guide['title'],
+            'url': f"/guides/#{guide['slug']}",
+            'keywords': " ".join(keywords),
+        }
+
+
+def iter_pdf_documents():
+    """Yield one passage per PDF page, so long documents do not match on scattered words."""
+    with stage('pdf_load'):
+        pdfs = load_pdf_content()
+    for doc in pdfs:
+        name = doc['title'].replace('_', ' ').replace('.pdf', '')
+        for number, page in enumerate(doc['pages'], 1):
+            yield {
+                'id': f"document_pdf:{doc['title']}#{number}",
+                'type': doc['type'],
+                'title': doc['title'] if len(doc['pages']) == 1 else f"{doc['title']} (p. {number})",
+                'url': doc['url'] if len(doc['pages']) == 1 else f"{doc['url']}#page={number}",
+                'keywords': f"{name} {page}",
+            }
+
+
+def iter_static_documents():
+    """Yield every document that only changes with a deploy."""
+    yield from iter_exam_documents()
+    yield from iter_pathology_documents()
+    yield from iter_guide_documents()
+    yield from iter_pdf_documents()
+
+
+def post_document_id(pk):
+    return f"article:{pk}"
+
+
+def post_document(post):
+    return {
+        'id': post_document_id(post.pk),
+        'type': 'article',
+        'title': post.title_display,
+        'url': post.get_absolute_url(),
+        'keywords': " ".join([post.title_fr, post.excerpt_fr, post.content_fr]),
+    }
@@ -0,0 +1,95 @@
+"""Light stemmers for the chatbot languages.
+
+Only inflections are removed (plural, and feminine for French), so that
+``resultats``, ``biopsies`` or ``douleurs`` match ``resultat``, ``biopsie``
+and ``douleur`` without merging words of different meaning the way a full
+stemmer would. Words are expected normalized (see ``core.chatbot.text``) and
+stemming a stem returns it unchanged.
+
+Indexed documents are stemmed once when the index is built; query words go
+through ``stem``, whose results are kept in a bounded table since messages
+keep using the same few hundred words.
+"""
+from functools import lru_cache
+
+
+# Bump when the rules change: index files built with other rules are then rebuilt
+STEMMER_VERSION = 2
+STEM_CACHE_SIZE = 50000
+
+# Words of this length or shorter are left alone ("les", "gaz", "bus")
+MIN_LENGTH = 3
+
+# Plurals no suffix rule gets back to their singular
+FRENCH_IRREGULAR = {
+    'maux': 'mal',
+    'travaux': 'travail',
+    'yeux': 'oeil',
+}
+
+FRENCH_FEMININE = (
+    ('ienne', 'ien'),
+    ('euse', 'eu'),
+    ('iere', 'ier'),
+    ('ive', 'if'),
+    ('ale', 'al'),
+    ('ee', 'e'),
+)
+
+
+def _stem_fr(word):
+    if word in FRENCH_IRREGULAR:
+        return FRENCH_IRREGULAR[word]
+    if word.endswith('aux') and len(word) > 4 and not word.endswith('eaux'):
+        return word[:-3] + 'al'
+    # "prix", "toux" or "reflux" are singular: only "-eux"/"-eaux" plurals lose their x.
+    # Invariable words lose their s in both numbers ("virus" -> "viru"), like "residus" -> "residu"
+    if (word.endswith('s') and not word.endswith('ss')) or word.endswith(('eux', 'eaux')):
+        word = word[:-1]
+    for suffix, replacement in FRENCH_FEMININE:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) > MIN_LENGTH:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def _strip_e(word):
+    """Drop the final e of a consonant ending ("headache" -> "headach"), as plurals in -es lose it."""
+    if word.endswith('e') and word[-2] not in 'aeiousy':
+        return word[:-1]
+    return word
+
+
+def _stem_en(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    return _strip_e(word)
+
+
+def _stem_es(word):
+    if word.endswith('ces') and len(word) > 4 and word[-4] in 'aeiou':
+        return word[:-3] + 'z'
+    if word.endswith('es') and len(word) > 4 and word[-3] not in 'aeious':
+        return word[:-2]
+    if word.endswith('s') and word[-2] in 'aeiou':
+        word = word[:-1]
+    return _strip_e(word)
+
+
+STEMMERS = {
+    'fr': _stem_fr,
+    'en': _stem_en,
+    'es': _stem_es,
+}
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word, lang='fr'):
+    """Stem of a normalized ``word`` (words of unknown languages are returned as is)."""
+    stemmer = STEMMERS.get(lang)
+    if stemmer is None or len(word) <= MIN_LENGTH or not word.isalpha():
+        return word
+    return stemmer(word)
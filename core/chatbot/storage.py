@@ -0,0 +1,338 @@
+"""On-disk format of a read-only index segment, mapped in memory by the workers.
+
+The static segment (exams, pathologies, guides, PDF pages) is written once to
+``CHATBOT_INDEX_PATH`` and every worker maps the same file: its pages live in
+the OS page cache and are shared, so neither boot time nor per-worker memory
+grows with the number of documents, and PDFs are not parsed again while the
+file is up to date.
+
+Layout (little-endian)::
+
+    b"CHATIDX\\0" | format version (uint32) | header length (uint32) | header (JSON) | sections
+
+The header holds the ``stamp`` the file was built from, the stemming
+language of its terms, the document count, the total length and the
+``(offset, size, typecode)`` of each section.
+Variable-length strings are stored as a ``Q`` offsets array plus a byte blob:
+document ids, document records (JSON ``[type, title, url, length]``), sorted
+terms and sorted title trigrams. Postings are ``I`` arrays of document rows
+and term counts, sliced by a ``Q`` offsets array aligned with the terms.
+
+``MappedSegment`` exposes the same read interface as ``InvertedIndex``:
+postings, documents and title trigrams are decoded on access, and only the
+``DOCUMENT_CACHE_SIZE`` most recently used documents are kept decoded.
+"""
+import array
+import bisect
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from functools import lru_cache
+
+from .index import Document, InvertedIndex
+
+
+MAGIC = b"CHATIDX\0"
+FORMAT_VERSION = 2
+_PREFIX = struct.Struct("<8sII")
+_ALIGNMENT = 8
+# Decoded documents kept per mapped segment (a query only loads its candidates)
+DOCUMENT_CACHE_SIZE = 2048
+
+
+class IndexFileError(Exception):
+    """The index file is missing, truncated or written in another format."""
+
+
+def _strings(values):
+    """``(offsets, blob)`` arrays of a list of strings."""
+    offsets, blob = array.array("Q", [0]), bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_segment(segment, path, stamp):
+    """Write an in-memory ``InvertedIndex`` to ``path`` (atomically, through a temporary file)."""
+    documents = sorted(segment.documents.values(), key=lambda document: document.position)
+    rows = {document.doc_id: row for row, document in enumerate(documents)}
+
+    sections = {}
+    sections["id_offsets"], sections["id_blob"] = _strings(document.doc_id for document in documents)
+    sections["record_offsets"], sections["record_blob"] = _strings(
+        json.dumps([document.type, document.title, document.url, document.length], ensure_ascii=False)
+        for document in documents
+    )
+    sections["id_order"] = array.array("I", sorted(range(len(documents)), key=lambda row: documents[row].doc_id.encode("utf-8")))
+
+    terms = sorted(segment.postings, key=lambda term: term.encode("utf-8"))
+    sections["term_offsets"], sections["term_blob"] = _strings(terms)
+    posting_offsets, posting_docs, posting_counts = array.array("Q", [0]), array.array("I"), array.array("I")
+    for term in terms:
+        for row, count in sorted((rows[doc_id], count) for doc_id, count in segment.postings[term].items()):
+            posting_docs.append(row)
+            posting_counts.append(count)
+        posting_offsets.append(len(posting_docs))
+    sections["posting_offsets"], sections["posting_docs"], sections["posting_counts"] = posting_offsets, posting_docs, posting_counts
+
+    grams = sorted(segment.title_postings, key=lambda gram: gram.encode("utf-8"))
+    sections["gram_offsets"], sections["gram_blob"] = _strings(grams)
+    gram_posting_offsets, gram_docs = array.array("Q", [0]), array.array("I")
+    for gram in grams:
+        gram_docs.extend(sorted(rows[doc_id] for doc_id in segment.title_postings[gram]))
+        gram_posting_offsets.append(len(gram_docs))
+    sections["gram_posting_offsets"], sections["gram_docs"] = gram_posting_offsets, gram_docs
+
+    # Section offsets are relative to the end of the header, whose length depends on them
+    layout, position = {}, 0
+    for name, data in sections.items():
+        size = len(data) * data.itemsize if isinstance(data, array.array) else len(data)
+        layout[name] = [position, size, data.typecode if isinstance(data, array.array) else "B"]
+        position += size + (-size % _ALIGNMENT)
+    header = json.dumps({
+        "stamp": stamp,
+        "lang": segment.lang,
+        "documents": len(documents),
+        "total_length": segment.total_length,
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGNMENT)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as handle:
+            handle.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            handle.write(header)
+            for name, data in sections.items():
+                raw = data.tobytes() if isinstance(data, array.array) else data
+                handle.write(raw)
+                handle.write(b"\0" * (-len(raw) % _ALIGNMENT))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_stamp(path):
+    """Stamp recorded in the index file at ``path``, or ``None`` if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as handle:
+            magic, version, header_length = _PREFIX.unpack(handle.read(_PREFIX.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            return json.loads(handle.read(header_length))["stamp"]
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+class _Strings:
+    """Read access to an ``(offsets, blob)`` pair of sections."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return str(self.raw(i), "utf-8")
+
+    def find(self, value, order=None):
+        """Index of ``value`` in the sorted strings (``order`` maps sorted ranks to indexes), or ``None``."""
+        key = value.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            i = order[middle] if order is not None else middle
+            if self.raw(i).tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self):
+            i = order[low] if order is not None else low
+            if self.raw(i).tobytes() == key:
+                return i
+        return None
+
+
+class PostingList(Mapping):
+    """``{doc_id: count}`` of one term, read from the mapped arrays."""
+
+    __slots__ = ("segment", "start", "stop")
+
+    def __init__(self, segment, start, stop):
+        self.segment = segment
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        doc_ids = self.segment.doc_ids
+        for row in self.segment.posting_docs[self.start:self.stop]:
+            yield doc_ids[row]
+
+    def items(self):
+        # Hot path of every search: the id decoding is inlined
+        offsets, blob = self.segment.doc_ids.offsets, self.segment.doc_ids.blob
+        rows = self.segment.posting_docs[self.start:self.stop]
+        counts = self.segment.posting_counts[self.start:self.stop]
+        return [(str(blob[offsets[row]:offsets[row + 1]], "utf-8"), count) for row, count in zip(rows, counts)]
+
+    def _position(self, doc_id):
+        row = self.segment.row(doc_id)
+        if row is None:
+            return None
+        position = bisect.bisect_left(self.segment.posting_docs, row, self.start, self.stop)
+        if position < self.stop and self.segment.posting_docs[position] == row:
+            return position
+        return None
+
+    def __getitem__(self, doc_id):
+        position = self._position(doc_id)
+        if position is None:
+            raise KeyError(doc_id)
+        return self.segment.posting_counts[position]
+
+    def __contains__(self, doc_id):
+        return self._position(doc_id) is not None
+
+
+class MappedPostings(Mapping):
+    """``{term: PostingList}`` over the mapped terms."""
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def __len__(self):
+        return len(self.segment.terms)
+
+    def __iter__(self):
+        terms = self.segment.terms
+        return (terms[i] for i in range(len(terms)))
+
+    def __getitem__(self, term):
+        i = self.segment.terms.find(term)
+        if i is None:
+            raise KeyError(term)
+        offsets = self.segment.posting_offsets
+        return PostingList(self.segment, offsets[i], offsets[i + 1])
+
+    def __contains__(self, term):
+        return self.segment.terms.find(term) is not None
+
+
+class MappedTitlePostings(Mapping):
+    """``{trigram: [doc_id]}`` over the mapped title trigrams."""
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def __len__(self):
+        return len(self.segment.grams)
+
+    def __iter__(self):
+        grams = self.segment.grams
+        return (grams[i] for i in range(len(grams)))
+
+    def __getitem__(self, gram):
+        i = self.segment.grams.find(gram)
+        if i is None:
+            raise KeyError(gram)
+        offsets, doc_ids = self.segment.gram_posting_offsets, self.segment.doc_ids
+        return [doc_ids[row] for row in self.segment.gram_docs[offsets[i]:offsets[i + 1]]]
+
+
+class MappedDocuments(Mapping):
+    """``{doc_id: Document}`` in index order; the recently used documents are kept decoded."""
+
+    def __init__(self, segment):
+        self.segment = segment
+        self._decode = lru_cache(maxsize=DOCUMENT_CACHE_SIZE)(self._decode)
+
+    def __len__(self):
+        return len(self.segment.doc_ids)
+
+    def __iter__(self):
+        doc_ids = self.segment.doc_ids
+        return (doc_ids[row] for row in range(len(doc_ids)))
+
+    def __contains__(self, doc_id):
+        return self.segment.row(doc_id) is not None
+
+    def __getitem__(self, doc_id):
+        return self._decode(doc_id)
+
+    def _decode(self, doc_id):
+        row = self.segment.row(doc_id)
+        if row is None:
+            raise KeyError(doc_id)
+        type, title, url, length = json.loads(str(self.segment.records.raw(row), "utf-8"))
+        return Document(doc_id, type, title, url, length, (), row)
+
+
+class MappedSegment(InvertedIndex):
+    """Read-only segment served from an index file written by ``write_segment``."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise IndexFileError(f"{path}: {exc}") from exc
+        try:
+            magic, version, header_length = _PREFIX.unpack_from(self._map)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise IndexFileError(f"{path}: unsupported index format")
+            header = json.loads(self._map[_PREFIX.size:_PREFIX.size + header_length])
+            base = _PREFIX.size + header_length
+            view = memoryview(self._map)
+            sections = {
+                name: view[base + offset:base + offset + size].cast(typecode)
+                for name, (offset, size, typecode) in header["sections"].items()
+            }
+        except (ValueError, KeyError, TypeError, struct.error) as exc:
+            raise IndexFileError(f"{path}: corrupted index file ({exc})") from exc
+
+        self.stamp = header["stamp"]
+        self.lang = header["lang"]
+        self.total_length = header["total_length"]
+        self.doc_ids = _Strings(sections["id_offsets"], sections["id_blob"])
+        self.records = _Strings(sections["record_offsets"], sections["record_blob"])
+        self.id_order = sections["id_order"]
+        self.terms = _Strings(sections["term_offsets"], sections["term_blob"])
+        self.posting_offsets = sections["posting_offsets"]
+        self.posting_docs = sections["posting_docs"]
+        self.posting_counts = sections["posting_counts"]
+        self.grams = _Strings(sections["gram_offsets"], sections["gram_blob"])
+        self.gram_posting_offsets = sections["gram_posting_offsets"]
+        self.gram_docs = sections["gram_docs"]
+
+        self.documents = MappedDocuments(self)
+        self.postings = MappedPostings(self)
+        self.title_postings = MappedTitlePostings(self)
+        self._next_position = len(self.doc_ids)
+        self._derived = {}
+
+    def row(self, doc_id):
+        return self.doc_ids.find(doc_id, self.id_order)
+
+    def add(self, doc):
+        raise TypeError("A mapped segment is read-only")
+
+    def remove(self, doc_id):
+        raise TypeError("A mapped segment is read-only")
+
+    def copy(self):
+        return self
@@ -0,0 +1,122 @@
+"""Synonym expansion compiled from the ``SYNONYMS_*`` tables of the lexicon.
+
+The tables are lists of ``(patient wording, site wording)`` pairs, either
+side possibly several words long. They are compiled once into a graph whose
+entries map a phrase (a tuple of normalized words) to every word reachable
+from it: chains such as ``dormir -> anesthesie -> dodo`` are followed, and a
+phrase listed with several targets keeps all of them. A message is then
+expanded in a single left-to-right pass, looking up the longest phrase
+starting at each word, so the cost depends on the message length only.
+
+Entries that are probably mistakes (the same pair listed twice, a phrase
+with several targets, a phrase leading back to itself, two inflections of
+the same word) are collected in ``SynonymGraph.conflicts`` and listed by
+``manage.py chatbot_synonyms``.
+"""
+from collections import namedtuple
+
+from .stemming import stem
+from .text import tokenize
+
+
+SynonymConflict = namedtuple('SynonymConflict', ['kind', 'phrase', 'targets'])
+
+DUPLICATE = 'duplicate'
+AMBIGUOUS = 'ambiguous'
+CYCLE = 'cycle'
+REDUNDANT = 'redundant'
+
+
+def phrase(text, lang=None):
+    """Normalized words of ``text``, stemmed when a ``lang`` is given."""
+    return tuple(stem(word, lang) if lang else word for word in tokenize(text))
+
+
+class SynonymGraph:
+    """Expansions of the ``(source, target)`` pairs of one language.
+
+    With a ``lang``, phrases are looked up by their stems, so a pair matches
+    every inflection of its source; targets are expanded as written.
+    """
+
+    def __init__(self, pairs, lang=None):
+        self.lang = lang
+        # Stemmed source -> {stemmed target: target}
+        edges = {}
+        self.conflicts = []
+        for source, target in pairs:
+            source, target_key, target = phrase(source, lang), phrase(target, lang), phrase(target)
+            if not source or not target:
+                continue
+            if target_key == source:
+                # Already matched through stemming
+                self.conflicts.append(SynonymConflict(REDUNDANT, ' '.join(source), (' '.join(target),)))
+                continue
+            targets = edges.setdefault(source, {})
+            if target_key in targets:
+                self.conflicts.append(SynonymConflict(DUPLICATE, ' '.join(source), (' '.join(target),)))
+            else:
+                targets[target_key] = target
+
+        for source, targets in edges.items():
+            if len(targets) > 1:
+                self.conflicts.append(
+                    SynonymConflict(AMBIGUOUS, ' '.join(source), tuple(' '.join(target) for target in targets.values()))
+                )
+
+        self.expansions = {}
+        for source in edges:
+            reachable = self._reachable(source, edges)
+            if source in reachable:
+                self.conflicts.append(SynonymConflict(CYCLE, ' '.join(source), (' '.join(source),)))
+            words = []
+            for target in reachable.values():
+                words.extend(word for word in target if word not in words and self._key(word) not in source)
+            self.expansions[source] = tuple(words)
+        self.max_phrase_length = max(map(len, self.expansions), default=0)
+
+    @staticmethod
+    def _reachable(source, edges):
+        """``{stemmed target: target}`` reachable from ``source``, in breadth-first order."""
+        reachable, queue = {}, list(edges[source].items())
+        while queue:
+            key, target = queue.pop(0)
+            if key in reachable:
+                continue
+            reachable[key] = target
+            queue.extend(edges.get(key, {}).items())
+        return reachable
+
+    def _key(self, word):
+        return stem(word, self.lang) if self.lang else word
+
+    def __len__(self):
+        return len(self.expansions)
+
+    def __contains__(self, text):
+        return phrase(text, self.lang) in self.expansions
+
+    def get(self, text, default=()):
+        """Words a word or phrase expands to."""
+        return self.expansions.get(phrase(text, self.lang), default)
+
+    def expand(self, words):
+        """Return ``words`` followed by their synonyms, without duplicates.
+
+        At each position, the longest phrase of the table starting there is
+        expanded.
+        """
+        words = list(words)
+        keys = [self._key(word) for word in words]
+        expanded = dict.fromkeys(words)
+        i = 0
+        while i < len(words):
+            for length in range(min(self.max_phrase_length, len(words) - i), 0, -1):
+                synonyms = self.expansions.get(tuple(keys[i:i + length]))
+                if synonyms is not None:
+                    expanded.update(dict.fromkeys(synonyms))
+                    i += length
+                    break
+            else:
+                i += 1
+        return list(expanded)
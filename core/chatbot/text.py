@@ -0,0 +1,23 @@
+"""Text normalization shared by the chatbot and its search index."""
+import re
+import unicodedata
+
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_text(text):
+    """Normalize text to remove accents, lowercase, and remove punctuation."""
+    # Remove accents
+    text = ''.join(c for c in unicodedata.normalize('NFD', text)
+                   if unicodedata.category(c) != 'Mn')
+    # Lowercase
+    text = text.lower()
+    # Replace punctuation with space
+    text = _PUNCTUATION_RE.sub(' ', text)
+    return text
+
+
+def tokenize(text):
+    """Return the normalized tokens of ``text``."""
+    return normalize_text(text).split()
@@ -0,0 +1,143 @@
+"""Per-stage timing of chatbot requests.
+
+A sampled request (``CHATBOT_TIMING_SAMPLE_RATE``, between 0 and 1) gets a
+``StageTimer``: each stage of the pipeline is timed with ``timer.stage(name)``
+and candidate counts are added up with ``timer.count(name, value)``. When
+the request ends, ``finish()`` logs one line on the ``core.chatbot.timing``
+logger (the values are also passed as ``extra={'chatbot_timing': ...}`` for
+structured handlers) and adds the durations to the process histograms served
+by ``/api/chatbot/stats/``. Requests that are not sampled get a timer whose
+methods do nothing.
+
+Code that runs deeper than the view (index build, PDF load) uses the
+module-level ``stage(name)``, which times into the timer made current by
+``timer.active()``. Stages may nest, so their durations can overlap.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in milliseconds (the last bucket is open)
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histograms:
+    """Thread-safe duration histograms, one per stage."""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS):
+        self.bounds = bounds
+        self.buckets = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration_ms):
+        bucket = bisect.bisect_left(self.bounds, duration_ms)
+        with self._lock:
+            counts = self.buckets.setdefault(name, [0] * (len(self.bounds) + 1))
+            counts[bucket] += 1
+            self.totals[name] = self.totals.get(name, 0) + duration_ms
+
+    def snapshot(self):
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        with self._lock:
+            return {
+                name: {
+                    'count': sum(counts),
+                    'mean_ms': self.totals[name] / sum(counts),
+                    'buckets_ms': dict(zip(labels, counts)),
+                }
+                for name, counts in self.buckets.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self.buckets.clear()
+            self.totals.clear()
+
+
+histograms = Histograms()
+
+
+class StageTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0) + (time.perf_counter() - start) * 1000
+
+    def count(self, name, value):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    @contextmanager
+    def active(self):
+        """Make this timer the one used by ``stage()`` in the enclosed code."""
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+    def finish(self, **fields):
+        total = (time.perf_counter() - self.started) * 1000
+        for name, duration in self.durations.items():
+            histograms.add(name, duration)
+        histograms.add('total', total)
+
+        values = dict(fields, total_ms=total, stages_ms=self.durations, counts=self.counts)
+        logger.info(
+            "chatbot timing total=%.2fms %s %s",
+            total,
+            " ".join(f"{name}={duration:.2f}ms" for name, duration in self.durations.items()),
+            " ".join(f"{name}={value}" for name, value in {**fields, **self.counts}.items()),
+            extra={'chatbot_timing': values},
+        )
+
+
+class NullTimer:
+    """Timer of the requests that are not sampled."""
+
+    def stage(self, name):
+        return nullcontext()
+
+    def count(self, name, value):
+        pass
+
+    def active(self):
+        return nullcontext(self)
+
+    def finish(self, **fields):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+_current_timer = ContextVar('chatbot_timer', default=NULL_TIMER)
+
+
+def start_timer():
+    """Timer of a new request: a ``StageTimer`` for sampled requests, else ``NULL_TIMER``."""
+    rate = getattr(settings, "CHATBOT_TIMING_SAMPLE_RATE", 0)
+    if rate > 0 and random.random() < rate:
+        return StageTimer()
+    return NULL_TIMER
+
+
+def stage(name):
+    """Time ``name`` into the current request's timer, if any."""
+    return _current_timer.get().stage(name)
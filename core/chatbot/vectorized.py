@@ -0,0 +1,161 @@
+"""Optional NumPy TF-IDF retrieval (``CHATBOT_RANKER = "tfidf"``).
+
+Each segment is compiled into a sparse matrix (``indptr``/``indices``/``data``
+arrays) of log-scaled, length-normalized term weights (SMART ``lnc``). A
+query becomes a vector of idf-weighted terms (``ltc``) and is scored
+against a whole segment with one sparse matrix-vector product, so large PDF
+collections are scored without a Python loop per document. Only the best
+rows are turned back into documents.
+
+NumPy is not a hard dependency: without it ``get_ranker`` falls back to BM25.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .ranking import Ranker, register_ranker
+from .storage import MappedSegment
+
+
+class TfidfMatrix:
+    """Term weights of one segment, stored term-major (the CSR layout of the transposed matrix).
+
+    Row ``t`` lists the documents containing term ``t`` (``doc_indices``)
+    and the term's weight in each of them (``data``), so a query only reads
+    the rows of its own terms. The postings of a mapped segment (see
+    ``core.chatbot.storage``) already have this layout: their arrays are
+    used in place and only the weights are computed.
+    """
+
+    def __init__(self, segment):
+        if isinstance(segment, MappedSegment):
+            self.size = len(segment.doc_ids)
+            self.term = segment.terms.find
+            self.row = segment.row
+            self.doc_id = segment.doc_ids.__getitem__
+            indptr = np.frombuffer(segment.posting_offsets, dtype=np.uint64).astype(np.int64)
+            doc_indices = np.frombuffer(segment.posting_docs, dtype=np.uint32)
+            counts = np.frombuffer(segment.posting_counts, dtype=np.uint32)
+        else:
+            doc_ids = list(segment.documents)
+            rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+            terms = {}
+            indptr, doc_indices, counts = [0], [], []
+            for token, postings in segment.postings.items():
+                terms[token] = len(terms)
+                for doc_id, count in postings.items():
+                    doc_indices.append(rows[doc_id])
+                    counts.append(count)
+                indptr.append(len(doc_indices))
+            self.size = len(doc_ids)
+            self.term = terms.get
+            self.row = rows.get
+            self.doc_id = doc_ids.__getitem__
+            indptr = np.array(indptr, dtype=np.int64)
+            doc_indices = np.array(doc_indices, dtype=np.int32)
+            counts = np.array(counts, dtype=np.float64)
+
+        weights = 1 + np.log(counts)
+        norms = np.bincount(doc_indices, weights=weights * weights, minlength=self.size)
+        self.indptr = indptr
+        self.doc_indices = doc_indices
+        self.data = (weights / np.sqrt(norms[doc_indices])).astype(np.float32)
+
+    def __len__(self):
+        return self.size
+
+    def dot(self, query):
+        """Scores of every document for ``query`` (``{token: weight}``)."""
+        rows = []
+        for token, weight in query.items():
+            row = self.term(token)
+            if row is not None:
+                rows.append((row, weight))
+        if not rows:
+            return np.zeros(self.size, dtype=np.float64)
+        starts = self.indptr[[row for row, _ in rows]]
+        lengths = self.indptr[[row + 1 for row, _ in rows]] - starts
+        # Positions of the stored values of the query terms, and the query weight of each of them.
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + offsets
+        weights = np.repeat(np.array([weight for _, weight in rows], dtype=np.float32), lengths)
+        return np.bincount(
+            self.doc_indices[positions], weights=self.data[positions] * weights, minlength=self.size,
+        )
+
+
+def segment_matrix(segment):
+    return segment.derived('tfidf', TfidfMatrix)
+
+
+class TfidfRanker(Ranker):
+    """Cosine similarity between TF-IDF vectors, computed segment-wide with NumPy."""
+
+    name = 'tfidf'
+    # Cosine scores are in [0, 1]: scale them to the range of the other rankers.
+    scale = 10
+
+    @classmethod
+    def available(cls):
+        return np is not None
+
+    def idf(self, index, token):
+        return math.log((1 + len(index)) / (1 + index.doc_freq(token))) + 1
+
+    def query_vector(self, index, weights):
+        query = {token: weight * self.idf(index, token) for token, weight in weights.items()}
+        norm = math.sqrt(sum(value * value for value in query.values())) or 1
+        return {token: value / norm for token, value in query.items()}
+
+    def segment_scores(self, index, weights):
+        query = self.query_vector(index, weights)
+        for segment in index.segments.values():
+            if len(segment):
+                matrix = segment_matrix(segment)
+                yield segment, matrix, matrix.dot(query) * self.scale
+
+    def score(self, index, candidates, weights=None):
+        segments = list(self.segment_scores(index, weights or {}))
+        for document, matched in candidates:
+            for segment, matrix, scores in segments:
+                row = matrix.row(document.doc_id)
+                if row is not None:
+                    yield float(scores[row]), document, matched
+                    break
+
+    def rank(self, index, weights, title=None, limit=None, required=None):
+        similar = {document.doc_id for document in index.similar_titles(title)} if title else set()
+        results = []
+        for segment, matrix, scores in self.segment_scores(index, weights):
+            allowed = None
+            if required is not None:
+                # Only the documents containing a required token keep their score
+                allowed = index.required_documents(segment, required)
+                mask = np.zeros(len(scores), dtype=bool)
+                mask[[matrix.row(doc_id) for doc_id in allowed]] = True
+                scores = np.where(mask, scores, 0)
+            rows = np.flatnonzero(scores)
+            if limit is not None and len(rows) > limit:
+                rows = rows[np.argpartition(-scores[rows], limit - 1)[:limit]]
+            kept = {matrix.doc_id(row) for row in rows.tolist()}
+            kept.update(
+                doc_id for doc_id in similar
+                if matrix.row(doc_id) is not None and (allowed is None or doc_id in allowed)
+            )
+            for doc_id in kept:
+                matched = {
+                    token: segment.postings[token][doc_id]
+                    for token in weights
+                    if doc_id in segment.postings.get(token, ())
+                }
+                results.append((float(scores[matrix.row(doc_id)]), segment.documents[doc_id], matched))
+        results.sort(key=lambda result: (-result[0], result[1].position))
+        if limit is not None:
+            results = results[:limit] + [result for result in results[limit:] if result[1].doc_id in similar]
+        return results
+
+
+register_ranker(TfidfRanker)
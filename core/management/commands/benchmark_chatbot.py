@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.chatbot.benchmark import BASELINE_PATH, QUERIES_PATH, load_queries, regressions, relevance, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure the chatbot latency, memory and top-1 accuracy on generated corpora (offline)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,1000,10000", help="Generated documents per run, comma separated")
+        parser.add_argument("--repeat", type=int, default=3, help="Replays of the query set per size")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated corpus")
+        parser.add_argument("--queries", default=QUERIES_PATH, help="Labelled queries (JSON)")
+        parser.add_argument("--min-accuracy", type=float, default=0.8, help="Fail below this top-1 accuracy")
+        parser.add_argument("--max-p95", type=float, help="Fail above this p95 latency (ms)")
+        parser.add_argument(
+            "--baseline", nargs="?", const=BASELINE_PATH,
+            help="Relevance results of a previous run to compare with (without a value, the committed baseline)",
+        )
+        parser.add_argument("--save", help="Write the relevance results (baseline format) to this JSON file")
+        parser.add_argument("--show-misses", action="store_true", help="List the queries answered wrongly")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError as exc:
+            raise CommandError("--sizes attend des entiers separes par des virgules.") from exc
+        queries = load_queries(options["queries"])
+        baseline = {}
+        if options.get("baseline"):
+            with open(options["baseline"], encoding="utf-8") as handle:
+                baseline = {result["size"]: result for result in json.load(handle)}
+
+        results, failures = [], []
+        for size in sizes:
+            result = run_benchmark(size, queries, repeat=options["repeat"], seed=options["seed"])
+            results.append(result)
+            self.stdout.write(
+                f"{size:>6} docs generes ({result['documents']} indexes)  "
+                f"construction {result['build_ms']:.0f} ms / {result['build_peak_mb']:.1f} Mo  "
+                f"p50 {result['p50_ms']:.2f}  p95 {result['p95_ms']:.2f}  p99 {result['p99_ms']:.2f} ms  "
+                f"memoire requetes {result['query_peak_mb']:.1f} Mo  "
+                f"precision {result['accuracy']:.1%}"
+            )
+            if options["show_misses"]:
+                for message, answer in result["misses"]:
+                    self.stdout.write(f"    {message!r} -> {answer}")
+
+            problems = []
+            if result["accuracy"] < options["min_accuracy"]:
+                problems.append(f"accuracy {result['accuracy']:.1%} < {options['min_accuracy']:.1%}")
+            if options.get("max_p95") is not None and result["p95_ms"] > options["max_p95"]:
+                problems.append(f"p95_ms {result['p95_ms']:.2f} > {options['max_p95']:.2f}")
+            if size in baseline:
+                problems.extend(regressions(result, baseline[size]))
+            failures.extend(f"[{size}] {problem}" for problem in problems)
+
+        if options.get("save"):
+            with open(options["save"], "w", encoding="utf-8") as handle:
+                json.dump([relevance(result) for result in results], handle, ensure_ascii=False, indent=2)
+
+        if failures:
+            raise CommandError("Regression du chatbot:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Benchmark du chatbot OK."))
@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from core.chatbot.index import InvertedIndex, build_blog_segment, static_stamp
+from core.chatbot.sources import (
+    iter_exam_documents, iter_guide_documents, iter_pathology_documents, iter_pdf_documents,
+)
+from core.chatbot.storage import MappedSegment, read_stamp, write_segment
+from core.rag_utils import rag_stamp
+
+
+STATIC_SOURCES = (
+    ("examens", iter_exam_documents),
+    ("pathologies", iter_pathology_documents),
+    ("guides", iter_guide_documents),
+    ("pages PDF", iter_pdf_documents),
+)
+
+
+class Command(BaseCommand):
+    help = "Build the chatbot index file of the static content (CHATBOT_INDEX_PATH), or check that it is up to date."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Index file (defaults to CHATBOT_INDEX_PATH)")
+        parser.add_argument("--check", action="store_true", help="Only check that the index file is up to date")
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the index file is up to date")
+
+    def handle(self, *args, **options):
+        path = options.get("path") or getattr(settings, "CHATBOT_INDEX_PATH", None)
+        if not path:
+            raise CommandError("CHATBOT_INDEX_PATH n'est pas defini.")
+        stamp = static_stamp(rag_stamp())
+
+        if options["check"]:
+            current = read_stamp(path)
+            if current is None:
+                raise CommandError(f"Index du chatbot absent ou illisible: {path}")
+            if current != stamp:
+                raise CommandError(f"Index du chatbot perime: {path} (relancer build_chatbot_index)")
+            self.stdout.write(self.style.SUCCESS(f"Index du chatbot a jour: {path}"))
+            return
+
+        if read_stamp(path) == stamp and not options["force"]:
+            self.stdout.write(self.style.WARNING(f"Index du chatbot deja a jour: {path} (utilise --force pour reconstruire)."))
+            return
+
+        segment = InvertedIndex()
+        for label, documents in STATIC_SOURCES:
+            start, count = time.perf_counter(), 0
+            for doc in documents():
+                segment.add(doc)
+                count += 1
+            self.stdout.write(f"{count:>6} {label:<12} {(time.perf_counter() - start) * 1000:>8.0f} ms")
+
+        start = time.perf_counter()
+        write_segment(segment, path, stamp)
+        mapped = MappedSegment(path)
+        if len(mapped) != len(segment) or len(mapped.postings) != len(segment.postings):
+            raise CommandError(f"Index du chatbot incoherent apres ecriture: {path}")
+        self.stdout.write(
+            f"{len(segment)} document(s), vocabulaire {len(segment.postings)} mots, "
+            f"{os.path.getsize(path) / 1024:.0f} Ko ecrits en {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        # Blog posts change at runtime and stay indexed in memory: only reported
+        start = time.perf_counter()
+        try:
+            blog = build_blog_segment()
+        except DatabaseError as exc:
+            self.stdout.write(self.style.WARNING(f"Articles du blog non comptes (base indisponible: {exc})."))
+        else:
+            self.stdout.write(
+                f"{len(blog):>6} {'articles':<12} {(time.perf_counter() - start) * 1000:>8.0f} ms "
+                f"(indexes en memoire, +{len(set(blog.postings) - set(segment.postings))} mots)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Index du chatbot ecrit: {path}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.chatbot.lexicon import SYNONYMS
+from core.chatbot.synonyms import SynonymGraph
+
+
+class Command(BaseCommand):
+    help = "List the suspicious entries (duplicates, several targets, cycles) of the chatbot synonym tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lang", choices=sorted(SYNONYMS), help="Only check this language")
+
+    def handle(self, *args, **options):
+        languages = [options["lang"]] if options.get("lang") else list(SYNONYMS)
+        total = 0
+        for lang in languages:
+            graph = SynonymGraph(SYNONYMS[lang], lang)
+            self.stdout.write(f"[{lang}] {len(graph)} entree(s), {len(graph.conflicts)} conflit(s)")
+            for conflict in graph.conflicts:
+                self.stdout.write(f"  {conflict.kind}: {conflict.phrase} -> {', '.join(conflict.targets)}")
+            total += len(graph.conflicts)
+
+        if total:
+            self.stdout.write(self.style.WARNING(f"{total} conflit(s) dans les synonymes."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucun conflit dans les synonymes."))
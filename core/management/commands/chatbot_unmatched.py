@@ -0,0 +1,68 @@
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.chatbot.analytics import analytics_sink, get_sink, unmatched_queries
+
+
+class Command(BaseCommand):
+    help = "Report the chatbot questions most often left unanswered (CHATBOT_ANALYTICS_PATH), to pick the FAQs to add."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Query log (defaults to CHATBOT_ANALYTICS_PATH)")
+        parser.add_argument("--limit", type=int, default=20, help="Number of questions listed")
+        parser.add_argument("--days", type=float, help="Only the questions of the last DAYS days")
+        parser.add_argument("--lang", help="Only the questions in this language")
+        parser.add_argument(
+            "--max-score", type=float,
+            help="Also count the questions whose best score is below MAX_SCORE (weak matches)",
+        )
+
+    def handle(self, *args, **options):
+        if options.get("path"):
+            sink = get_sink(
+                options["path"],
+                max_bytes=getattr(settings, "CHATBOT_ANALYTICS_MAX_BYTES", 10 * 1024 * 1024),
+                backups=getattr(settings, "CHATBOT_ANALYTICS_BACKUPS", 5),
+            )
+        else:
+            sink = analytics_sink()
+            if sink is None:
+                raise CommandError("CHATBOT_ANALYTICS_PATH n'est pas defini.")
+
+        since = time.time() - options["days"] * 86400 if options.get("days") else None
+        total, latencies = 0, []
+
+        def records():
+            nonlocal total
+            for record in sink.read():
+                if since is not None and (record.get("time") or 0) < since:
+                    continue
+                if options.get("lang") and record.get("lang") != options["lang"]:
+                    continue
+                total += 1
+                if record.get("latency_ms") is not None:
+                    latencies.append(record["latency_ms"])
+                yield record
+
+        counts = unmatched_queries(records(), options.get("max_score"))
+        if not total:
+            self.stdout.write(self.style.WARNING(f"Aucune question enregistree dans {sink.path}."))
+            return
+
+        unmatched = sum(count for count, _, _ in counts.values())
+        latencies.sort()
+        self.stdout.write(
+            f"{total} question(s), {unmatched} sans reponse ({unmatched / total:.1%}), "
+            f"latence mediane {latencies[len(latencies) // 2] if latencies else 0:.1f} ms"
+        )
+        ranked = sorted(counts.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        for query, (count, last, languages) in ranked[:options["limit"]]:
+            day = datetime.fromtimestamp(last).strftime("%Y-%m-%d") if last else "?"
+            langs = ",".join(sorted(lang for lang in languages if lang)) or "?"
+            self.stdout.write(f"{count:>6}  {day}  {langs:<5} {query}")
+
+        if not counts:
+            self.stdout.write(self.style.SUCCESS("Toutes les questions ont trouve une reponse."))
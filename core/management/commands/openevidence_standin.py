@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.chatbot.openevidence_standin import StandInServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in of the OpenEvidence service (set DJANGO_OPENEVIDENCE_URL to its URL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+        parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+        parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+
+    def handle(self, *args, **options):
+        server = StandInServer(
+            (options["host"], options["port"]),
+            delay=options["delay"],
+            failure_rate=options["failure_rate"],
+            verbose=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stand-in OpenEvidence sur {server.url} (Ctrl+C pour arreter)."))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,7 +1,32 @@
+import logging
 import os
 from django.conf import settings
 from functools import lru_cache
 
+# Part of the chatbot's pipeline (PDF pages are indexed), hence its logger
+logger = logging.getLogger('core.chatbot.rag')
+
+def rag_directory():
+    return os.path.join(settings.BASE_DIR, 'static', 'rag_documents')
+
+
+def rag_stamp():
+    """
+    Empreinte des PDF du dossier rag_documents (nom, taille, date de modification).
+    Change dès qu'un fichier est ajouté, remplacé ou supprimé.
+    """
+    try:
+        entries = os.scandir(rag_directory())
+    except FileNotFoundError:
+        return ()
+    with entries:
+        return tuple(sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in entries
+            if entry.name.lower().endswith('.pdf')
+        ))
+
+
 @lru_cache(maxsize=1)
 def load_pdf_content():
     """
@@ -12,10 +37,10 @@ def load_pdf_content():
     try:
         from pypdf import PdfReader
     except ImportError:
-        print("Erreur: pypdf n'est pas installé. La fonctionnalité RAG sera désactivée.")
+        logger.warning("Erreur: pypdf n'est pas installé. La fonctionnalité RAG sera désactivée.")
         return []
 
-    rag_dir = os.path.join(settings.BASE_DIR, 'static', 'rag_documents')
+    rag_dir = rag_directory()
     documents = []
 
     if not os.path.exists(rag_dir):
@@ -28,9 +53,8 @@ def load_pdf_content():
             file_path = os.path.join(rag_dir, filename)
             try:
                 reader = PdfReader(file_path)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
+                pages = [page.extract_text() for page in reader.pages]
+                text = "\n".join(pages) + "\n"
                 
                 # On combine le titre et le contenu pour la recherche
                 searchable_text = f"{filename.replace('_', ' ').replace('.pdf', '')} {text}"
@@ -40,9 +64,10 @@ def load_pdf_content():
                     'title': filename,
                     'url': f"{settings.STATIC_URL}rag_documents/{filename}", 
                     'content': text, # Gardé pour affichage éventuel
+                    'pages': pages, # Indexés séparément par le chatbot
                     'keywords': searchable_text # Utilisé par views.py pour la recherche
                 })
             except Exception as e:
-                print(f"Erreur lors de la lecture de {filename}: {e}")
+                logger.warning("Erreur lors de la lecture de %s: %s", filename, e)
 
     return documents
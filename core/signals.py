@@ -1,12 +1,17 @@
 from django.conf import settings
 from django.core.mail import send_mail
 from django.core import signing
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .chatbot import index as chatbot_index
 from .models import BlogPost, BlogSubscriber
 
 
+CHATBOT_INDEXED_FIELDS = {"slug", "status", "published_at", "title_fr", "excerpt_fr", "content_fr"}
+
+
 def _build_post_url(post):
     base_url = getattr(settings, "SITE_URL", "").rstrip("/")
     return f"{base_url}{post.get_absolute_url()}" if base_url else post.get_absolute_url()
@@ -62,3 +67,16 @@ def notify_subscribers(sender, instance, created, **kwargs):
 
     instance.newsletter_sent = True
     instance.save(update_fields=["newsletter_sent"])
+
+
+@receiver(post_save, sender=BlogPost)
+def update_chatbot_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CHATBOT_INDEXED_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: chatbot_index.update_post(instance))
+
+
+@receiver(post_delete, sender=BlogPost)
+def remove_from_chatbot_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: chatbot_index.remove_post(pk))
@@ -1,3 +1,492 @@
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .chatbot.analytics import SqliteSink
+from .chatbot.cache import ResponseCache
+from .chatbot.fuzzy import Speller, SpellingDictionary, levenshtein
+from .chatbot.index import BlogSegment, InvertedIndex, SearchIndex, get_speller
+from .chatbot.keywords import GREETING, MEDICAL, KeywordAutomaton, Pattern, get_intent_matcher
+from .chatbot.openevidence import (
+    CannedBackend, CircuitBreaker, HttpBackend, OpenEvidenceError, OpenEvidenceUnavailable, get_backend,
+    get_openevidence_answer,
+)
+from .chatbot.openevidence_standin import start_standin
+from .chatbot.stemming import stem
+from .chatbot.storage import IndexFileError, MappedSegment, read_stamp, write_segment
+from .chatbot.synonyms import AMBIGUOUS, CYCLE, DUPLICATE, REDUNDANT, SynonymGraph
+from .chatbot.vectorized import TfidfRanker, np
+from .views import chatbot_answer, chatbot_api, chatbot_batch_api, chatbot_stats, sse_event
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class OpenEvidenceBackendTests(SimpleTestCase):
+    """``HttpBackend`` against the local stand-in of the OpenEvidence service."""
+
+    def setUp(self):
+        self.server = start_standin()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def backend(self, **options):
+        backend = HttpBackend(self.server.url, **options)
+        self.addCleanup(backend.pool.close)
+        return backend
+
+    def test_answers_are_cached(self):
+        backend = self.backend()
+        expected = CannedBackend().answer("question", 'risk')
+        self.assertEqual(backend.answer("question", 'risk'), expected)
+        self.assertEqual(backend.answer("question", 'risk'), expected)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_read_timeout(self):
+        self.server.delay = 1.0
+        backend = self.backend(read_timeout=0.1)
+        start = time.monotonic()
+        with self.assertRaises(OpenEvidenceError):
+            backend.answer("question")
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(backend.breaker.failures, 1)
+
+    def test_timeout_falls_back_to_canned_answer(self):
+        self.server.delay = 1.0
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        with override_settings(OPENEVIDENCE_URL=self.server.url, OPENEVIDENCE_READ_TIMEOUT=0.1):
+            self.assertIsInstance(get_backend(), HttpBackend)
+            with self.assertLogs('core.chatbot.openevidence', 'WARNING'):
+                answer = get_openevidence_answer("question", 'exam')
+            self.assertEqual(answer, CannedBackend().answer("question", 'exam'))
+
+    def test_answer_markup_is_escaped(self):
+        with mock.patch('core.views.get_openevidence_answer', return_value="<img src=x onerror=alert(1)>"):
+            response = chatbot_answer("question", 'openevidence', None, record=False)['response']
+        self.assertIn("&lt;img src=x onerror=alert(1)&gt;", response)
+        self.assertNotIn("<img", response)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        self.server.failure_rate = 1.0
+        backend = self.backend(failure_threshold=2)
+        for question in ("first", "second"):
+            with self.assertRaises(OpenEvidenceError):
+                backend.answer(question)
+        self.assertEqual(backend.breaker.state, CircuitBreaker.OPEN)
+        # The service is left alone while the circuit is open
+        with self.assertRaises(OpenEvidenceUnavailable):
+            backend.answer("third")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_half_open_circuit_recovers(self):
+        self.server.failure_rate = 1.0
+        backend = self.backend(failure_threshold=1, reset_timeout=30)
+        clock = backend.breaker.clock = FakeClock()
+        with self.assertRaises(OpenEvidenceError):
+            backend.answer("question")
+
+        clock.now = 29
+        with self.assertRaises(OpenEvidenceUnavailable):
+            backend.answer("question")
+        # A failed probe opens the circuit again
+        clock.now = 30
+        with self.assertRaises(OpenEvidenceError):
+            backend.answer("question")
+        self.assertEqual(backend.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.server.requests, 2)
+
+        self.server.failure_rate = 0.0
+        clock.now = 60
+        self.assertEqual(backend.answer("question"), CannedBackend().answer("question"))
+        self.assertEqual(backend.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(backend.answer("other"), CannedBackend().answer("other"))
+        self.assertEqual(self.server.requests, 4)
+
+
+class KeywordAutomatonTests(SimpleTestCase):
+    def test_every_occurrence_is_found(self):
+        automaton = KeywordAutomaton([('he', 'a'), ('she', 'b'), ('hers', 'c'), ('his', 'd')])
+        hits = [(hit.start, hit.end, hit.keyword) for hit in automaton.find('ushers')]
+        self.assertEqual(hits, [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')])
+        self.assertEqual(automaton.categories('this'), {'d'})
+        self.assertEqual(automaton.categories('xyz'), set())
+
+    def test_whole_words(self):
+        automaton = KeywordAutomaton([Pattern('hi', GREETING, whole_word=True), Pattern('polype', MEDICAL)])
+        self.assertEqual(automaton.categories('hi'), {GREETING})
+        for text in ('hi docteur', 'docteur\thi', 'merci\nhi\n'):
+            with self.subTest(text=text):
+                self.assertEqual(automaton.categories(text), {GREETING})
+        self.assertEqual(automaton.categories('chirurgie'), set())
+        # Keywords without the flag still match inside words
+        self.assertEqual(automaton.categories('polypes'), {MEDICAL})
+
+    def test_intent_matcher(self):
+        self.assertEqual(get_intent_matcher().categories('bonjour docteur'), {GREETING})
+        self.assertNotIn(GREETING, get_intent_matcher().categories('chirurgie du colon'))
+
+
+class SynonymGraphTests(SimpleTestCase):
+    def test_chains_are_followed(self):
+        graph = SynonymGraph([('dormir', 'anesthesie'), ('anesthesie', 'dodo')], 'fr')
+        self.assertEqual(graph.get('dormir'), ('anesthesie', 'dodo'))
+        self.assertEqual(graph.get('anesthesie'), ('dodo',))
+        self.assertEqual(graph.expand(['dormir']), ['dormir', 'anesthesie', 'dodo'])
+        self.assertEqual(graph.conflicts, [])
+
+    def test_longest_phrase_is_expanded(self):
+        graph = SynonymGraph([('mal au ventre', 'douleur abdominale'), ('ventre', 'abdomen')], 'fr')
+        self.assertEqual(
+            graph.expand(['j', 'ai', 'mal', 'au', 'ventre']), ['j', 'ai', 'mal', 'au', 'ventre', 'douleur', 'abdominale'],
+        )
+        # Sources match every inflection of their words
+        self.assertEqual(graph.expand(['ventres']), ['ventres', 'abdomen'])
+
+    def test_conflicts(self):
+        graph = SynonymGraph([
+            ('selles', 'caca'), ('selles', 'caca'),
+            ('ventre', 'abdomen'), ('ventre', 'estomac'),
+            ('colique', 'crampe'), ('crampe', 'colique'),
+            ('polype', 'polypes'),
+        ], 'fr')
+        conflicts = {(conflict.kind, conflict.phrase): conflict.targets for conflict in graph.conflicts}
+        self.assertEqual(conflicts, {
+            (DUPLICATE, 'selle'): ('caca',),
+            (AMBIGUOUS, 'ventre'): ('abdomen', 'estomac'),
+            (CYCLE, stem('colique', 'fr')): (stem('colique', 'fr'),),
+            (CYCLE, stem('crampe', 'fr')): (stem('crampe', 'fr'),),
+            (REDUNDANT, 'polype'): ('polypes',),
+        })
+        # Both targets of an ambiguous phrase are kept
+        self.assertEqual(graph.get('ventre'), ('abdomen', 'estomac'))
+
+
+class SqliteSinkTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'queries.sqlite3')
+
+    def record(self, query, age_days):
+        return {'time': time.time() - age_days * 86400, 'query': query, 'lang': 'fr', 'type': 'normal',
+                'score': 0, 'answer': 'fallback', 'target': None, 'latency_ms': 1.0, 'cached': False}
+
+    def test_old_records_are_pruned(self):
+        sink = SqliteSink(self.path, retention_days=30)
+        sink.write([self.record('ancienne', 31), self.record('recente', 1)])
+        self.assertEqual([record['query'] for record in sink.read()], ['recente'])
+        self.assertEqual(sink.pruned, 1)
+
+    def test_pruning_is_throttled(self):
+        sink = SqliteSink(self.path, retention_days=30)
+        sink.write([self.record('recente', 1)])
+        sink.write([self.record('ancienne', 31)])
+        self.assertEqual(len(list(sink.read())), 2)
+        connection = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(sink.prune(connection), 1)
+        finally:
+            connection.close()
+
+
+def source(doc_id, keywords):
+    return {'id': doc_id, 'type': 'blog', 'title': keywords, 'url': f'/{doc_id}/', 'keywords': keywords}
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(maxsize=2)
+        cache.put('a', {'response': 'A'}, 1)
+        cache.put('b', {'response': 'B'}, 1)
+        self.assertEqual(cache.get('a', 1), {'response': 'A'})
+        cache.put('c', {'response': 'C'}, 1)
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), {'response': 'A'})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_new_index_version_empties_the_cache(self):
+        cache = ResponseCache()
+        cache.put('a', {'response': 'A'}, 1)
+        self.assertIsNone(cache.get('a', 2))
+        self.assertEqual((len(cache), cache.stats()['invalidations'], cache.version), (0, 1, 2))
+
+    def test_answers_follow_the_index_version(self):
+        cache = ResponseCache()
+        before = InvertedIndex([source('examen:a', "coloscopie")])
+        after = InvertedIndex([source('examen:a', "coloscopie"), source('blog:zorblaxine', "zorblaxine")])
+        with mock.patch('core.views.get_response_cache', return_value=cache):
+            fallback = chatbot_answer("zorblaxine", 'normal', SearchIndex({'static': before}, version=1), record=False)
+            self.assertNotIn('/blog:zorblaxine/', fallback['response'])
+            # Same version: the cached answer is kept even though the index changed
+            cached = chatbot_answer("zorblaxine", 'normal', SearchIndex({'static': after}, version=1), record=False)
+            self.assertEqual(cached, fallback)
+            answer = chatbot_answer("zorblaxine", 'normal', SearchIndex({'static': after}, version=2), record=False)
+        self.assertIn('/blog:zorblaxine/', answer['response'])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+class BatchApiTests(SimpleTestCase):
+    def setUp(self):
+        index = SearchIndex({'static': InvertedIndex([source('examen:coloscopie', "coloscopie")])}, version=1)
+        for name, value in (('get_index', index), ('get_response_cache', ResponseCache())):
+            patcher = mock.patch(f'core.views.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, body, is_staff=True):
+        request = RequestFactory().post('/api/chatbot/batch/', json.dumps(body), content_type='application/json')
+        request.user = SimpleNamespace(is_staff=is_staff)
+        response = chatbot_batch_api(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_staff_only(self):
+        self.assertEqual(self.post(["bonjour"], is_staff=False), (403, {'error': 'Forbidden'}))
+
+    def test_answers_in_order(self):
+        status, data = self.post({'messages': ["bonjour", {'message': "coloscopie"}, 42]})
+        self.assertEqual(status, 200)
+        responses = data['responses']
+        self.assertEqual(len(responses), 3)
+        self.assertIn('/examen:coloscopie/', responses[1]['response'])
+        self.assertEqual(responses[2]['response'], "Je n'ai pas compris votre message.")
+
+    def test_message_limit(self):
+        self.assertEqual(self.post(["bonjour"] * 50)[0], 200)
+        self.assertEqual(self.post(["bonjour"] * 51), (400, {'error': 'At most 50 messages per batch'}))
+        with override_settings(CHATBOT_BATCH_LIMIT=2):
+            self.assertEqual(self.post(["bonjour"] * 3)[0], 400)
+
+    def test_invalid_bodies(self):
+        self.assertEqual(self.post({'messages': "bonjour"}), (400, {'error': 'Expected a list of messages'}))
+
+    def test_stats_report_the_index_size(self):
+        request = RequestFactory().get('/api/chatbot/stats/')
+        request.user = SimpleNamespace(is_staff=True)
+        with mock.patch('core.views.get_query_log', return_value=None):
+            stats = json.loads(chatbot_stats(request).content)
+        self.assertEqual(stats['index'], {'version': 1, 'documents': 1, 'vocabulary': 1})
+
+
+def parse_events(body):
+    """``[(name, data)]`` of a server-sent events stream."""
+    events = []
+    for block in body.split('\n\n')[:-1]:
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class StreamTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SearchIndex({'static': InvertedIndex([source('examen:coloscopie', "coloscopie")])}, version=1)
+        for name, value in (('get_index', self.index), ('get_response_cache', ResponseCache()), ('record_query', None)):
+            patcher = mock.patch(f'core.views.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stream(self, body):
+        request = RequestFactory().post('/api/chatbot/', json.dumps({**body, 'stream': True}), content_type='application/json')
+        response = chatbot_api(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        return parse_events(b''.join(response.streaming_content).decode())
+
+    def test_event_framing(self):
+        # A multi-line message stays on one data line
+        event = sse_event('answer', {'response': "ligne 1\nligne 2"})
+        self.assertEqual(event, 'event: answer\ndata: {"response": "ligne 1\\nligne 2"}\n\n')
+        self.assertEqual(parse_events(event), [('answer', {'response': "ligne 1\nligne 2"})])
+
+    def test_streamed_answer_matches_json_answer(self):
+        events = self.stream({'message': "coloscopie"})
+        names = [name for name, _ in events]
+        self.assertEqual(names[names.index('answer'):], ['answer', 'complement'])
+        answer, complement = dict(events)['answer'], dict(events)['complement']
+        self.assertEqual(answer, chatbot_answer("coloscopie", 'normal', self.index, record=False))
+        # The suggested OpenEvidence answer comes with the stream, the canned backend answering locally
+        self.assertTrue(answer['suggest_openevidence'])
+        self.assertIn("Voici des informations complémentaires", complement['response'])
+
+    def test_error_event(self):
+        with mock.patch('core.views.chatbot_answer_stages', side_effect=RuntimeError("boom")):
+            with self.assertLogs('core.chatbot.views', 'ERROR'):
+                events = self.stream({'message': "coloscopie"})
+        self.assertEqual(events, [('error', {'response': "Une erreur est survenue."})])
+
+
+class SpellerTests(SimpleTestCase):
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein('coloscopie', 'coloscopie', 2), 0)
+        self.assertEqual(levenshtein('coloscopie', 'colosopie', 2), 1)
+        self.assertEqual(levenshtein('coloscopie', 'kolloscopie', 2), 2)
+        # Past the bound, only "too far" is known
+        self.assertEqual(levenshtein('coloscopie', 'gastroscopie', 2), 3)
+
+    def test_closest_words(self):
+        dictionary = SpellingDictionary([('polype', 3), ('polypes', 1), ('anesthesie', 1), ('colon', 5)])
+        self.assertEqual(dictionary.closest('polipe'), (1, ['polype']))
+        # Typos past the stored prefix are found as well
+        self.assertEqual(dictionary.closest('anesthezie'), (1, ['anesthesie']))
+        self.assertEqual(dictionary.closest('anesteshie'), (2, ['anesthesie']))
+        self.assertEqual(dictionary.closest('colin'), (1, ['colon']))
+        # Words under five letters tolerate no typo
+        self.assertEqual(dictionary.closest('col'), (None, []))
+        self.assertEqual(dictionary.closest('gastroscopie'), (None, []))
+
+    def test_most_frequent_word_wins(self):
+        speller = Speller([('biopsie', 1), ('biopsia', 4)], known=['bilan'])
+        self.assertEqual(speller.correct('biopsio'), 'biopsia')
+        self.assertIsNone(speller.correct('biopsie'))
+        self.assertIsNone(speller.correct('bilan'))
+        self.assertIsNone(speller.correct('xyzxyz'))
+
+    def test_layered_speller(self):
+        base = Speller([('coloscopie', 2), ('biopsie', 1)])
+        speller = Speller([('biopsia', 3), ('gastroscopie', 1)], base=base)
+        self.assertIn('coloscopie', speller)
+        self.assertEqual(speller.correct('coloscopi'), 'coloscopie')
+        self.assertEqual(speller.correct('gastroskopie'), 'gastroscopie')
+        # Ties between the layers go to the most frequent word
+        self.assertEqual(speller.correct('biopsio'), 'biopsia')
+
+
+class SpellerCacheTests(SimpleTestCase):
+    def test_blog_change_keeps_the_static_speller(self):
+        static = InvertedIndex([source('static', "coloscopie sous anesthesie")])
+        blog = BlogSegment()
+        blog.add(source('post-1', "gastroscopie"))
+        speller = get_speller([static, blog])
+
+        updated = blog.copy()
+        updated.add(source('post-2', "rectosigmoidoscopie"))
+        updated_speller = get_speller([static, updated])
+        self.assertIsNot(updated_speller, speller)
+        self.assertIs(updated_speller.base, speller.base)
+        self.assertIs(get_speller([static, updated]), updated_speller)
+
+        self.assertEqual(updated_speller.correct('colloscopie'), stem('coloscopie', 'fr'))
+        self.assertEqual(updated_speller.correct('gastroscopi'), stem('gastroscopie', 'fr'))
+        self.assertEqual(updated_speller.correct('rectosigmoidoscopy'), stem('rectosigmoidoscopie', 'fr'))
+        self.assertIsNone(speller.correct('rectosigmoidoscopy'))
+
+
+class StemmingTests(SimpleTestCase):
+    PAIRS = {
+        'fr': [
+            ('resultat', 'resultats'), ('biopsie', 'biopsies'), ('polype', 'polypes'), ('hopital', 'hopitaux'),
+            ('nouveau', 'nouveaux'), ('travail', 'travaux'), ('mal', 'maux'), ('heureux', 'heureuse'),
+            ('douloureux', 'douloureuses'), ('normal', 'normale'), ('actif', 'active'), ('residu', 'residus'),
+        ],
+        'es': [
+            ('paciente', 'pacientes'), ('noche', 'noches'), ('parte', 'partes'), ('hospital', 'hospitales'),
+            ('examen', 'examenes'), ('cita', 'citas'), ('vez', 'veces'), ('dulce', 'dulces'), ('clase', 'clases'),
+            ('enfermedad', 'enfermedades'),
+        ],
+        'en': [
+            ('result', 'results'), ('biopsy', 'biopsies'), ('headache', 'headaches'), ('church', 'churches'),
+            ('glass', 'glasses'), ('cause', 'causes'), ('disease', 'diseases'), ('knee', 'knees'),
+        ],
+    }
+
+    def test_singular_and_plural_share_a_stem(self):
+        for lang, pairs in self.PAIRS.items():
+            for singular, plural in pairs:
+                with self.subTest(lang=lang, word=plural):
+                    self.assertEqual(stem(plural, lang), stem(singular, lang))
+
+    def test_stems_are_stable(self):
+        for lang, pairs in self.PAIRS.items():
+            for word in (word for pair in pairs for word in pair):
+                with self.subTest(lang=lang, word=word):
+                    self.assertEqual(stem(stem(word, lang), lang), stem(word, lang))
+
+    def test_singular_words_ending_in_s_or_x_are_kept(self):
+        for word in ('prix', 'toux', 'reflux'):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), word)
+
+
+class IndexFileTests(SimpleTestCase):
+    SOURCES = [
+        {'id': 'examen:coloscopie', 'type': 'examen', 'title': 'Coloscopie', 'url': '/examens/coloscopie/',
+         'keywords': "Coloscopie preparation du colon, polypes et biopsies sous anesthesie"},
+        {'id': 'pathologie:hemorroides', 'type': 'pathologie', 'title': 'Hémorroïdes', 'url': '/pathologies/hemorroides/',
+         'keywords': "Hemorroides: sang rouge dans les selles, douleurs anales"},
+        {'id': 'guide:regime', 'type': 'guide', 'title': 'Régime sans résidu', 'url': '/guides/regime/',
+         'keywords': "Regime sans residu avant la coloscopie, pas de legumes ni de fruits"},
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'index.bin')
+        self.segment = InvertedIndex(self.SOURCES)
+        write_segment(self.segment, self.path, 'stamp-1')
+
+    def mapped(self):
+        return MappedSegment(self.path)
+
+    def test_round_trip(self):
+        mapped = self.mapped()
+        self.assertEqual(read_stamp(self.path), 'stamp-1')
+        self.assertEqual(mapped.stamp, 'stamp-1')
+        self.assertEqual((len(mapped), mapped.total_length, mapped.lang),
+                         (len(self.segment), self.segment.total_length, self.segment.lang))
+        self.assertEqual({term: dict(postings) for term, postings in mapped.postings.items()}, self.segment.postings)
+        self.assertEqual(
+            {gram: set(doc_ids) for gram, doc_ids in mapped.title_postings.items()}, self.segment.title_postings,
+        )
+        self.assertEqual(list(mapped.documents), list(self.segment.documents))
+        for doc_id, document in self.segment.documents.items():
+            with self.subTest(doc_id=doc_id):
+                decoded = mapped.documents[doc_id]
+                for name in ('type', 'title', 'url', 'length', 'position'):
+                    self.assertEqual(getattr(decoded, name), getattr(document, name), name)
+                self.assertEqual(
+                    (decoded.signature.bits, decoded.signature.size), (document.signature.bits, document.signature.size),
+                )
+        self.assertNotIn('examen:inconnu', mapped.documents)
+        self.assertNotIn('inconnu', mapped.postings)
+
+    def test_stale_or_corrupt_files_are_rejected(self):
+        write_segment(self.segment, self.path, 'stamp-2')
+        self.assertEqual(read_stamp(self.path), 'stamp-2')
+        with open(self.path, 'rb') as handle:
+            data = handle.read()
+
+        with open(self.path, 'wb') as handle:
+            handle.write(data[:12])
+        self.assertIsNone(read_stamp(self.path))
+        with self.assertRaises(IndexFileError):
+            MappedSegment(self.path)
+
+        with open(self.path, 'wb') as handle:
+            handle.write(b'NOTINDEX' + data[8:])
+        self.assertIsNone(read_stamp(self.path))
+        with self.assertRaises(IndexFileError):
+            MappedSegment(self.path)
+
+        self.assertIsNone(read_stamp(self.path + '.missing'))
+
+    @skipUnless(np is not None, "NumPy is not installed")
+    def test_tfidf_ranks_mapped_and_memory_segments_alike(self):
+        ranker = TfidfRanker()
+        weights = {stem('coloscopie'): 1, stem('residu'): 0.5}
+        in_memory = ranker.rank(SearchIndex({'static': self.segment}), weights, title='coloscopie')
+        mapped = ranker.rank(SearchIndex({'static': self.mapped()}), weights, title='coloscopie')
+        self.assertEqual(
+            [(round(score, 5), document.doc_id) for score, document, _ in mapped],
+            [(round(score, 5), document.doc_id) for score, document, _ in in_memory],
+        )
@@ -1,17 +1,36 @@
 """Site pages for Dr Bronstein."""
 
-from django.http import Http404, JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.utils.html import escape
 from django.utils.translation import gettext_lazy as _, get_language
 from django.views.decorators.csrf import csrf_exempt
 from django.core import signing
+from django.conf import settings
+import heapq
 import json
-import unicodedata
-import difflib
+import logging
+import time
+from .chatbot.analytics import get_query_log, record_query
+from .chatbot.cache import get_response_cache
+from .chatbot.context import resolve_message
+from .chatbot.executor import get_openevidence_executor, run_in_executor
+from .chatbot.faq import get_faq_matcher
+from .chatbot.index import get_index
+from .chatbot.keywords import GREETING, MEDICAL, get_intent_matcher
+from .chatbot.language import detect_language
+from .chatbot.lexicon import OPENEVIDENCE_TOPICS
+from .chatbot.openevidence import get_backend as get_openevidence_backend, get_openevidence_answer
+from .chatbot.ranking import get_ranker
+from .chatbot.similarity import signature, similarity, upper_bound
+from .chatbot.text import normalize_text
+from .chatbot.timing import NULL_TIMER, histograms as timing_histograms, start_timer
 from .forms import ContactForm
 from .models import BlogPost, BlogSubscriber, BlogCategory, BlogTag
-from .rag_utils import load_pdf_content
+
+
+logger = logging.getLogger('core.chatbot.views')
 
 
 EXAMS = [
@@ -1381,19 +1400,285 @@ def contact_view(request):
     return render(request, "core/contact.html", context)
 
 
-import re
-import difflib
+# Site content results considered per message (documents with a similar title are always considered)
+CHATBOT_CONTENT_CANDIDATES = 50
+
+# Ranked pages listed when a request asks for ``results`` (``true`` or a count)
+CHATBOT_DEFAULT_RESULTS = 5
+CHATBOT_MAX_RESULTS = 10
+
+def chatbot_stages(user_message, request_type, profile, index, results=0, timer=NULL_TIMER, focus=None, outcome=None):
+    """Yield the chatbot's ``(stage, data)`` results for a normalized message, as they become ready.
+
+    ``('faq', data)`` is yielded as soon as the best FAQ is known, and
+    ``('answer', response_data)`` always comes last. With ``results``, the
+    answer also lists the ``results`` best site pages. A follow-up message
+    is only matched against the site pages about its ``focus`` entity.
+    The ``outcome`` dict, if given, receives the ``score``, kind of
+    ``answer`` and ``target`` (FAQ question or page URL) of the answer.
+    """
+    if outcome is None:
+        outcome = {}
+    # Greetings, medical keywords and OpenEvidence topics found in one pass over the message
+    with timer.stage('intents'):
+        intents = get_intent_matcher().categories(user_message)
+
+    if request_type == 'openevidence':
+        # Configured OpenEvidence backend, the canned answers of the topic being the offline fallback
+        topic = next((topic for topic, _ in OPENEVIDENCE_TOPICS if topic in intents), None)
+        with timer.stage('openevidence'):
+            response_text = get_openevidence_answer(user_message, topic)
+        outcome.update(answer='openevidence', target=topic)
+
+        # The widget renders answers as HTML: the text of a remote service must not carry markup
+        yield 'answer', {
+            'response': f"Voici des informations complémentaires : \n\n{escape(response_text)}\n\n(Ceci est une réponse générée automatiquement, veuillez consulter votre médecin pour un avis personnalisé.)"
+        }
+        return
+
+    if not user_message:
+        outcome.update(answer='empty')
+        yield 'answer', {'response': "Je n'ai pas compris votre message."}
+        return
+
+    lang = profile.code
+    stop_words = profile.stop_words
+    synonyms = profile.synonyms
+
+    # Basic greetings
+    if GREETING in intents:
+        outcome.update(answer='greeting')
+        yield 'answer', {'response': profile.greeting_response}
+        return
+
+    ranker = get_ranker()
+
+    # Keyword matching against the precompiled FAQs of the detected language
+    with timer.stage('faq'):
+        best_faq, max_score = get_faq_matcher(lang).best(user_message, ranker, index.speller)
+    best_match = best_faq.answer if best_faq else None
+    answer, target = ('faq', best_faq.question) if best_faq else ('fallback', None)
+    if best_faq:
+        yield 'faq', {'response': best_faq.answer}
+
+    # Search in site content (Exams, Pathologies, Guides, Blog, PDFs) - Mainly for French context or universal terms
+    # Expand synonyms (and multi-word phrases) instead of replacing
+    with timer.stage('query'):
+        # Only documents sharing a meaningful word (or a similar title) with the query are scored,
+        # misspelled words being replaced by their best correction. Known multi-word terms
+        # ("prise de sang") are matched as a whole, stop words included, their own words barely counting
+        weights = index.message_weights(
+            user_message.split(),
+            lambda words: [w for w in synonyms.expand(words) if w not in stop_words and len(w) > 2],
+        )
+        required = None
+        if focus:
+            focus_words = focus.name.split()
+            required = index.phrase_weights(focus_words) or index.query_weights(
+                [w for w in focus_words if w not in stop_words and len(w) > 2]
+            )
+    timer.count('query_terms', len(weights))
+    # Bounded min-heap of the best pages, the earliest indexed page winning ties
+    top_pages = []
+    with timer.stage('ranking'):
+        candidates = ranker.rank(index, weights, title=user_message, limit=CHATBOT_CONTENT_CANDIDATES, required=required)
+    timer.count('candidates', len(candidates))
+    # Computed once the candidates are loaded, their titles registering trigrams the message may share
+    message_signature = signature(user_message, grow=False)
+    with timer.stage('scoring'):
+        for score, item, matched in candidates:
+            # Similarity with the title, skipped when it could not make this document the best match
+            # (or one of the listed results)
+            floor = max_score
+            if results:
+                floor = min(floor, top_pages[0][0][0] if len(top_pages) == results else 0)
+            bound = upper_bound(message_signature, item.signature)
+            if bound > 0.6 and score + bound * 25 > floor:
+                ratio = similarity(message_signature, item.signature)
+                if ratio > 0.6:
+                    score += ratio * 25
+
+            if results and score > 0:
+                entry = ((score, -item.position, item.doc_id), (item, matched))
+                if len(top_pages) < results:
+                    heapq.heappush(top_pages, entry)
+                elif entry[0] > top_pages[0][0]:
+                    heapq.heapreplace(top_pages, entry)
+
+            if score > max_score:
+                max_score = score
+                best_match = f"Je vous suggère de consulter notre fiche {item.type} sur '{item.title}'. <br><a href='{item.url}'>Cliquez ici pour voir la page</a>."
+                answer, target = 'page', item.url
+
+    logger.debug("Best match score: %s", max_score)
+
+    response_data = {}
+
+    if best_match and max_score >= 5: # Minimum score threshold
+        response_data['response'] = best_match
+    elif best_match and max_score > 0:
+         response_data['response'] = best_match
+    else:
+        # Fallback to contact info if no match
+        response_data['response'] = profile.fallback_response
+        answer, target = 'fallback', None
+    outcome.update(score=max_score, answer=answer, target=target)
+
+    # Always suggest OpenEvidence for medical queries to allow complementary info
+    if MEDICAL in intents:
+        response_data['suggest_openevidence'] = True
+
+    if results:
+        response_data['results'] = [
+            {
+                'type': item.type,
+                'title': item.title,
+                'url': item.url,
+                'score': round(key[0], 3),
+                'matched': sorted(matched),
+            }
+            for key, (item, matched) in sorted(top_pages, reverse=True)
+        ]
+
+    yield 'answer', response_data
+
+
+def type_option(value, default='normal'):
+    """Request type of a message (``'normal'`` or ``'openevidence'``), ``default`` when not a string."""
+    return value if isinstance(value, str) else default
+
+
+def results_option(value):
+    """Number of ranked pages asked for by the ``results`` option of a request."""
+    if value is True:
+        return CHATBOT_DEFAULT_RESULTS
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return min(value, CHATBOT_MAX_RESULTS)
+    return 0
+
+
+def context_option(value):
+    """Context slug sent back by the widget, ``None`` when missing or invalid."""
+    if isinstance(value, str) and 0 < len(value) <= 64:
+        return value
+    return None
+
+
+def chatbot_answer_stages(raw_message, request_type, index, results=0, timer=NULL_TIMER, context=None, record=True):
+    """``chatbot_stages`` of one message, a cached answer being yielded alone.
+
+    ``context`` is the slug of the exam or pathology the conversation is
+    about, as returned in the ``context`` of the previous answer. With
+    ``record``, the message and its outcome are added to the query analytics
+    log.
+    """
+    started = time.perf_counter()
+    with timer.stage('normalize'):
+        user_message = normalize_text(raw_message)
+
+    # Language detection, and the FAQs, word lists and responses of that language
+    with timer.stage('language'):
+        profile = detect_language(user_message.split())
+
+    # A follow-up ("et pour la preparation ?") is about the exam or pathology named earlier in the conversation
+    with timer.stage('context'):
+        user_message, focus, context = resolve_message(context, user_message, profile.stop_words)
+    if focus:
+        timer.count('follow_ups', 1)
+
+    # Repeated questions are answered from the cache until a blog post or a RAG PDF changes.
+    # OpenEvidence answers are cached by their backend, which must not keep its fallback answers.
+    cache = get_response_cache()
+    cacheable = request_type != 'openevidence'
+    cache_key = (user_message, profile.code, request_type, results, focus)
+    if cacheable:
+        with timer.stage('cache'):
+            response_data = cache.get(cache_key, index.version)
+        if response_data is not None:
+            timer.count('cache_hits', 1)
+            yield 'answer', {**response_data, 'context': context}
+            # The outcome of a cached answer is not kept, only whether it was the fallback
+            if record:
+                answer = 'fallback' if response_data.get('response') == profile.fallback_response else 'cache'
+                record_query(
+                    query=user_message, lang=profile.code, type=request_type, answer=answer,
+                    latency_ms=(time.perf_counter() - started) * 1000, cached=True,
+                )
+            return
+    outcome = {}
+    for stage, response_data in chatbot_stages(user_message, request_type, profile, index, results, timer, focus, outcome):
+        # The widget sends the context back with the next message, the cached answer does not keep it
+        yield stage, {**response_data, 'context': context} if stage == 'answer' else response_data
+    if cacheable:
+        cache.put(cache_key, response_data, index.version)
+    if record:
+        record_query(
+            query=user_message, lang=profile.code, type=request_type, **outcome,
+            latency_ms=(time.perf_counter() - started) * 1000, cached=False,
+        )
+
+
+def chatbot_answer(raw_message, request_type, index, results=0, timer=NULL_TIMER, context=None, record=True):
+    """Response data for one message, from the cache when possible."""
+    for stage, response_data in chatbot_answer_stages(raw_message, request_type, index, results, timer, context, record):
+        pass
+    return response_data
+
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def chatbot_events(raw_message, request_type, results=0, timer=NULL_TIMER, context=None):
+    """Server-sent events of a streamed chatbot answer.
+
+    ``faq`` carries the best FAQ answer as soon as it is known, ``answer``
+    the final response data (the same as the JSON mode) and, when
+    OpenEvidence is suggested and answers locally, ``complement`` carries
+    the complementary answer so the widget does not need a second request.
+    A remote OpenEvidence service is only asked when the patient clicks.
+    """
+    try:
+        with timer.active(), timer.stage('index'):
+            index = get_index()
+        for stage, response_data in chatbot_answer_stages(raw_message, request_type, index, results, timer, context):
+            with timer.stage('serialization'):
+                event = sse_event(stage, response_data)
+            yield event
+        if response_data.get('suggest_openevidence') and get_openevidence_backend().local:
+            with timer.stage('complement'):
+                # Prefetched, not asked by the patient: not logged
+                complement = chatbot_answer(raw_message, 'openevidence', index, context=context, record=False)
+            yield sse_event('complement', complement)
+    except Exception as e:
+        logger.exception("Chatbot error: %s", e)
+        yield sse_event('error', {'response': "Une erreur est survenue."})
+    finally:
+        timer.finish(type=request_type, stream=True)
+
+
+def chatbot_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Ask nginx not to buffer the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def request_executor(request_type):
+    """Pool of an async request: OpenEvidence waits for the service on its own threads."""
+    return get_openevidence_executor() if request_type == 'openevidence' else None
+
+
+async def _aiter_in_executor(iterator, executor=None):
+    """Consume a blocking iterator on ``executor`` (by default the chatbot pool), one item at a time."""
+    done = object()
+    while True:
+        item = await run_in_executor(next, iterator, done, executor=executor)
+        if item is done:
+            return
+        yield item
 
-def normalize_text(text):
-    """Normalize text to remove accents, lowercase, and remove punctuation."""
-    # Remove accents
-    text = ''.join(c for c in unicodedata.normalize('NFD', text)
-                  if unicodedata.category(c) != 'Mn')
-    # Lowercase
-    text = text.lower()
-    # Replace punctuation with space
-    text = re.sub(r'[^\w\s]', ' ', text)
-    return text
 
 @csrf_exempt
 def chatbot_api(request):
@@ -1401,516 +1686,141 @@ def chatbot_api(request):
         try:
             data = json.loads(request.body)
             raw_message = data.get('message', '')
-            user_message = normalize_text(raw_message)
-            request_type = data.get('type', 'normal') # 'normal' or 'openevidence'
-            
-            if request_type == 'openevidence':
-                # Simulation of OpenEvidence API call
-                # In a real scenario, you would call the OpenEvidence API here
-                
-                response_text = "D'après les recommandations actuelles, ce sujet nécessite une évaluation clinique approfondie."
-                
-                if any(w in user_message for w in ['risque', 'danger', 'complication', 'risk', 'perforation', 'hemorragie']):
-                     response_text = "Les études montrent une incidence très faible de complications majeures (< 0.1%). Le rapport bénéfice/risque reste très favorable pour le dépistage."
-                elif any(w in user_message for w in ['traitement', 'soigner', 'medicament', 'treatment', 'guerir', 'aspirine', 'anticoagulant']):
-                     response_text = "Les protocoles actuels préconisent une approche graduelle. Pour les traitements anticoagulants, un avis médical est indispensable avant tout acte endoscopique."
-                elif any(w in user_message for w in ['coloscopie', 'gastroscopie', 'endoscopie', 'examen', 'camera', 'polype']):
-                     response_text = "L'endoscopie est l'examen de référence pour explorer le tube digestif. Elle permet un diagnostic précis (visuel et biopsies) et parfois un traitement immédiat (ex: ablation de polypes)."
-                elif any(w in user_message for w in ['symptome', 'douleur', 'signe', 'symptom', 'mal', 'ventre']):
-                     response_text = "La présentation clinique peut être variable. L'examen clinique et l'endoscopie sont souvent nécessaires pour confirmer le diagnostic et exclure d'autres pathologies."
-                elif any(w in user_message for w in ['prepa', 'boire', 'manger', 'regime']):
-                     response_text = "La qualité de la préparation est le facteur prédictif le plus important pour la réussite de l'examen. Il est crucial de suivre le protocole à la lettre."
-
-                return JsonResponse({
-                    'response': f"Voici des informations complémentaires : \n\n{response_text}\n\n(Ceci est une réponse générée automatiquement, veuillez consulter votre médecin pour un avis personnalisé.)"
-                })
-            
-            print(f"Chatbot received: {raw_message} -> {user_message}")
-
-            if not user_message:
-                return JsonResponse({'response': "Je n'ai pas compris votre message."})
-
-            # Language detection
-            words = user_message.split()
-            
-            # Markers
-            en_markers = {
-                'the', 'this', 'that', 'these', 'those', 'with', 'for', 'from', 'about', 
-                'you', 'your', 'my', 'mine', 'we', 'our', 'they', 'their',
-                'have', 'has', 'had', 'are', 'was', 'were', 'will', 'would', 'can', 'could', 'should',
-                'what', 'where', 'when', 'how', 'why', 'who', 'which',
-                'hello', 'hi', 'thanks', 'please', 'appointment', 'pain', 'doctor', 'help', 'morning', 'evening',
-                'do', 'does', 'did', 'is', 'am', 'need', 'want'
-            }
-            
-            es_markers = {
-                'el', 'los', 'las', 'un', 'una', 'unos', 'unas', 
-                'es', 'son', 'fue', 'fueron', 'estoy', 'estas', 'esta', 'estamos', 'estan',
-                'yo', 'usted', 'nosotros', 'vosotros', 'ellos', 'ellas',
-                'que', 'como', 'donde', 'cuando', 'porque', 'quien', 'cual',
-                'por', 'para', 'con', 'del', 'al', 'sin',
-                'hola', 'gracias', 'cita', 'dolor', 'medico', 'ayuda', 'buenos', 'dias', 'tarde', 'noche',
-                'tengo', 'necesito', 'quiero'
-            }
-            
-            fr_markers = {
-                'le', 'les', 'des', 'du', 'au', 'aux', 
-                'est', 'sont', 'suis', 'etes', 'etait', 'etaient',
-                'je', 'nous', 'vous', 'ils', 'elles', 'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses', 'notre', 'votre',
-                'quoi', 'comment', 'quand', 'pourquoi', 'quel', 'quelle', 'quels', 'quelles',
-                'dans', 'sur', 'sous', 'avec', 'sans', 'pour', 'par',
-                'bonjour', 'bonsoir', 'merci', 'rendez-vous', 'rdv', 'douleur', 'medecin', 'aide',
-                'ai', 'besoin', 'veux', 'voudrais'
-            }
+            request_type = type_option(data.get('type')) # 'normal' or 'openevidence'
+            results = results_option(data.get('results'))
+            context = context_option(data.get('context'))
+            timer = start_timer()
 
-            score_en = sum(1 for w in words if w in en_markers)
-            score_es = sum(1 for w in words if w in es_markers)
-            score_fr = sum(1 for w in words if w in fr_markers)
-
-            # Default to FR
-            lang = 'fr'
-            if score_en > score_fr and score_en > score_es:
-                lang = 'en'
-            elif score_es > score_fr and score_es > score_en:
-                lang = 'es'
-            
-            print(f"Detected language: {lang} (FR:{score_fr}, EN:{score_en}, ES:{score_es})")
-
-            # Select data based on language
-            if lang == 'en':
-                current_faqs = FAQS_EN
-                greeting_response = "Hello! How can I help you?"
-                fallback_response = "I'm not sure I understand. You can contact us at 40 81 48 48 or check our FAQ page."
-                stop_words = {
-                    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'up', 'about', 'into', 'over', 'after',
-                    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'shall', 'should', 'can', 'could', 'may', 'might', 'must',
-                    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her', 'its', 'our', 'their', 'me', 'him', 'us', 'them',
-                    'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how',
-                    'this', 'that', 'these', 'those', 'here', 'there',
-                    'please', 'thanks', 'thank', 'hello', 'hi'
-                }
-                # English Synonyms
-                synonyms = {
-                    "rdv": "appointment",
-                    "dr": "doctor",
-                    "cost": "payment",
-                    "price": "payment",
-                    "pay": "payment",
-                    "eat": "fasting",
-                    "drink": "fasting",
-                    "food": "fasting",
-                    "meal": "fasting",
-                    "hurt": "pain",
-                    "ache": "pain",
-                    "stomach": "abdominal",
-                    "belly": "abdominal",
-                    "location": "park",
-                    "address": "park",
-                    "parking": "park",
-                    "result": "results",
-                    "poop": "stool",
-                    "burn": "reflux",
-                    "acid": "reflux",
-                    "virus": "hepatitis",
-                    "alcohol": "cirrhosis",
-                    "hours": "hours",
-                    "open": "hours",
-                    "close": "hours",
-                    "time": "hours",
-                }
-            elif lang == 'es':
-                current_faqs = FAQS_ES
-                greeting_response = "¡Hola! ¿En qué puedo ayudarle?"
-                fallback_response = "No estoy seguro de entender. Puede contactarnos al 40 81 48 48 o consultar nuestra página de preguntas frecuentes."
-                stop_words = {
-                    'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'y', 'o', 'pero', 'si', 'no', 'en', 'a', 'de', 'del', 'al', 'por', 'para', 'con', 'sin', 'sobre',
-                    'es', 'son', 'fue', 'fueron', 'ser', 'estar', 'estoy', 'estas', 'esta', 'estamos', 'estan', 'haber', 'hay', 'tener', 'tengo', 'tienes', 'tiene', 'tenemos', 'tienen',
-                    'yo', 'tu', 'el', 'ella', 'nosotros', 'vosotros', 'ellos', 'ellas', 'mi', 'tu', 'su', 'nuestro', 'vuestro', 'me', 'te', 'le', 'nos', 'os', 'les',
-                    'que', 'quien', 'donde', 'cuando', 'como', 'porque', 'cual', 'cuales',
-                    'este', 'esta', 'estos', 'estas', 'ese', 'esa', 'esos', 'esas', 'aquel', 'aquella', 'aquellos', 'aquellas',
-                    'hola', 'gracias', 'por favor'
-                }
-                # Spanish Synonyms
-                synonyms = {
-                    "cita": "consulta",
-                    "dr": "medico",
-                    "doctor": "medico",
-                    "precio": "pago",
-                    "costo": "pago",
-                    "pagar": "pago",
-                    "comer": "ayunas",
-                    "beber": "ayunas",
-                    "comida": "ayunas",
-                    "alimentos": "ayunas",
-                    "doler": "dolor",
-                    "estomago": "abdominal",
-                    "barriga": "abdominal",
-                    "direccion": "aparcar",
-                    "ubicacion": "aparcar",
-                    "estacionamiento": "aparcar",
-                    "parking": "aparcar",
-                    "resultado": "resultados",
-                    "caca": "heces",
-                    "ardor": "reflujo",
-                    "acidez": "reflujo",
-                    "virus": "hepatitis",
-                    "alcohol": "cirrosis",
-                    "horas": "horarios",
-                    "abierto": "horarios",
-                    "cerrado": "horarios",
-                    "tiempo": "horarios",
-                }
-            else: # FR
-                current_faqs = FAQS_FR
-                greeting_response = "Bonjour ! Comment puis-je vous aider ?"
-                fallback_response = "Je ne suis pas sûr de comprendre. Vous pouvez nous contacter au 40 81 48 48 ou consulter notre page FAQ."
-                stop_words = {
-                    'le', 'la', 'les', 'de', 'du', 'des', 'un', 'une', 'est', 'il', 'elle', 'je', 'tu', 'nous', 'vous', 'ils', 'elles', 
-                    'a', 'au', 'aux', 'ce', 'cette', 'ces', 'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses', 'notre', 'votre', 
-                    'leur', 'leurs', 'que', 'qui', 'quoi', 'ou', 'quand', 'comment', 'pourquoi', 'quel', 'quelle', 'quels', 'quelles', 
-                    'sur', 'sous', 'dans', 'par', 'pour', 'en', 'vers', 'avec', 'sans', 'y', 't', 'me', 'se', 'c', 'qu', 'j', 'l', 'n', 'd', 's', 'm',
-                    'cest', 'quest', 'qu est', 'c est', 'sont', 'suis', 'es', 'sommes', 'etes', 'ete', 'etait', 'etaient',
-                    'donne', 'moi', 'toi', 'lui', 'eux', 'ca', 'ceci', 'cela', 'faire', 'avoir', 'etre', 'aller', 'voir', 'savoir', 'pouvoir', 'vouloir', 'devoir', 'falloir',
-                    'bonjour', 'merci', 'svp', 'plait', 'sil', 'te', 'se', 'nous', 'vous', 'ils', 'elles', 'on', 'en', 'y',
-                    'numero', 'num', 'info', 'infos', 'information', 'informations', 'renseignement', 'renseignements',
-                }
-                synonyms = {
-                    "rdv": "rendez-vous",
-                    "docteur": "medecin",
-                    "dr": "medecin",
-                    "prix": "paiement",
-                    "tarif": "paiement",
-                    "cout": "paiement",
-                    "argent": "paiement",
-                    "reglement": "paiement",
-                    "manger": "jeun",
-                    "boire": "jeun",
-                    "repas": "jeun",
-                    "nourriture": "jeun",
-                    "alcool": "jeun",
-                    "mal": "douleurs",
-                    "bide": "abdominale",
-                    "ventre": "abdominale",
-                    "estomac": "abdominale",
-                    "parking": "garer",
-                    "stationnement": "garer",
-                    "resultat": "resultats",
-                    "biopsie": "biopsies",
-                    "lait": "lactose",
-                    "caca": "selles",
-                    "popo": "selles",
-                    "toilette": "selles",
-                    "fesses": "anus",
-                    "derriere": "anus",
-                    "brulure": "reflux",
-                    "remontee": "reflux",
-                    "acide": "reflux",
-                    "virus": "hepatite",
-                    "contamination": "hepatite",
-                    "mici": "crohn",
-                    "rch": "rectocolite",
-                    "alcool": "cirrhose",
-                    "fibrose": "cirrhose",
-                    "constipation": "manometrie",
-                    "incontinence": "manometrie",
-                    "heures": "horaires",
-                    "heure": "horaires",
-                    "ouverture": "horaires",
-                    "fermeture": "horaires",
-                    "telephone": "contacter",
-                    "tel": "contacter",
-                    "mail": "contacter",
-                    "mails": "contacter",
-                    "email": "contacter",
-                    "emails": "contacter",
-                    "joindre": "contacter",
-                    "appeler": "contacter",
-                    # Anatomy
-                    "intestin": "abdominale",
-                    "colon": "abdominale",
-                    "foie": "hepatique",
-                    "oesophage": "abdominale",
-                    "gorge": "oesophage",
-                    "rectum": "anus",
-                    "bouche": "abdominale",
-                    # Symptoms - Pain/Discomfort
-                    "douleur": "douleurs",
-                    "souffrance": "douleurs",
-                    "bobo": "douleurs",
-                    "crampe": "douleurs",
-                    "spasme": "douleurs",
-                    "picotement": "douleurs",
-                    "lance": "douleurs",
-                    "aigreur": "reflux",
-                    "pyrosis": "reflux",
-                    "regurgitation": "reflux",
-                    "amer": "reflux",
-                    # Symptoms - Digestive
-                    "vomi": "vomissements",
-                    "vomir": "vomissements",
-                    "gerber": "vomissements",
-                    "nausee": "vomissements",
-                    "ecoeurement": "vomissements",
-                    "sang": "saignement",
-                    "saigne": "saignement",
-                    "hemorragie": "saignement",
-                    "rouge": "saignement",
-                    "noir": "melena",
-                    "goudron": "melena",
-                    "diarrhee": "transit",
-                    "chiasse": "transit",
-                    "courante": "transit",
-                    "liquide": "transit",
-                    "eau": "transit",
-                    "dur": "constipation",
-                    "bloque": "constipation",
-                    "coince": "constipation",
-                    "bouche": "constipation",
-                    "gaz": "ballonnements",
-                    "pet": "ballonnements",
-                    "rot": "ballonnements",
-                    "ballonne": "ballonnements",
-                    "gonfle": "ballonnements",
-                    "air": "ballonnements",
-                    "glouglou": "ballonnements",
-                    # General State
-                    "fatigue": "asthenie",
-                    "epuise": "asthenie",
-                    "creve": "asthenie",
-                    "fievre": "temperature",
-                    "chaud": "temperature",
-                    "frisson": "temperature",
-                    "maigrir": "poids",
-                    "grossir": "poids",
-                    "appetit": "faim",
-                    # Procedures
-                    "colo": "coloscopie",
-                    "gastro": "gastroscopie",
-                    "endo": "endoscopie",
-                    "camera": "endoscopie",
-                    "tuyau": "endoscopie",
-                    "fibro": "gastroscopie",
-                    "echo": "echographie",
-                    "scan": "scanner",
-                    "irm": "scanner",
-                    "operation": "intervention",
-                    "chirurgie": "intervention",
-                    "bloc": "intervention",
-                    "anesthesie": "dodo",
-                    "dormir": "anesthesie",
-                    "reveil": "anesthesie",
-                    "sedation": "anesthesie",
-                    # Preparation
-                    "preparation": "prepa",
-                    "purge": "prepa",
-                    "sachet": "prepa",
-                    "picoprep": "prepa",
-                    "citrafleet": "prepa",
-                    "moviprep": "prepa",
-                    "colokit": "prepa",
-                    "izinova": "prepa",
-                    "kleanprep": "prepa",
-                    # Conditions
-                    "ulcere": "pathologie",
-                    "tumeur": "pathologie",
-                    "polype": "pathologie",
-                    "kyste": "pathologie",
-                    "diverticule": "pathologie",
-                    "hernie": "pathologie",
-                    "calcul": "lithiase",
-                    "caillou": "lithiase",
-                    "pierre": "lithiase",
-                    "vesicule": "lithiase",
-                    "gluten": "coeliaque",
-                    "ble": "coeliaque",
-                    "sucre": "intolerance",
-                    # Administrative
-                    "carte": "vitale",
-                    "vitale": "assurance",
-                    "mutuelle": "assurance",
-                    "remboursement": "paiement",
-                    "secu": "assurance",
-                    "cps": "assurance",
-                    "feuille": "papier",
-                    "ordonnance": "prescription",
-                    "papier": "document",
-                    "arret": "travail",
-                    "certificat": "document",
-                    "lettre": "courrier",
-                    "dossier": "document",
-                    # Urgency/Feelings
-                    "peur": "anxiete",
-                    "stress": "anxiete",
-                    "inquiet": "anxiete",
-                    "angoisse": "anxiete",
-                    "grave": "urgence",
-                    "urgent": "urgence",
-                    "vite": "urgence",
-                    "maintenant": "urgence",
-                    "secours": "urgence",
-                    "aide": "urgence",
-                }
-
-            # Basic greetings
-            if any(word in user_message.split() for word in ['bonjour', 'salut', 'hello', 'bonsoir', 'hi', 'hola', 'buenos', 'dias']):
-                 return JsonResponse({'response': greeting_response})
-
-            # Simple keyword matching
-            best_match = None
-            max_score = 0
-
-            for item in current_faqs:
-                question = normalize_text(item['q'])
-                
-                user_words = user_message.split()
-                # Apply synonyms
-                user_words = [synonyms.get(w, w) for w in user_words]
-                user_words_set = set(user_words)
-                
-                question_words = set(question.split())
-                
-                # 1. Exact matches
-                common_words = user_words_set.intersection(question_words)
-                meaningful_matches = [w for w in common_words if w not in stop_words and len(w) > 2]
-                score = len(meaningful_matches) * 30  # FAQs are prioritized (30pts per word)
-                
-                # 2. Fuzzy matches (handle typos)
-                for u_word in user_words_set:
-                    if u_word in stop_words or u_word in common_words or len(u_word) < 3:
-                        continue
-                    # Find close matches in question words
-                    matches = difflib.get_close_matches(u_word, question_words, n=1, cutoff=0.85)
-                    if matches:
-                        score += 15 # Fuzzy match bonus
-
-                # 3. Coverage bonus (prioritize questions where a larger portion of the question is matched)
-                question_meaningful_words = [w for w in question_words if w not in stop_words and len(w) > 2]
-                if question_meaningful_words:
-                    coverage = len(meaningful_matches) / len(question_meaningful_words)
-                    score += coverage * 10
-
-                # 4. Sequence Matcher (Sentence similarity)
-                # This helps when the user asks a question very similar to the FAQ title
-                seq_ratio = difflib.SequenceMatcher(None, normalize_text(user_message), question).ratio()
-                if seq_ratio > 0.5:
-                    score += seq_ratio * 30  # Big bonus for sentence similarity
-                
-                if score > max_score:
-                    max_score = score
-                    best_match = item['a']
-            
-            # Search in site content (Exams, Pathologies, Guides, Blog) - Mainly for French context or universal terms
-            site_content = []
-            for exam in EXAMS:
-                keywords = [
-                    exam['title'],
-                    exam.get('description', ''),
-                    " ".join(exam.get('indications', [])),
-                    exam.get('preparation', ''),
-                    exam.get('procedure', ''),
-                    exam.get('aftercare', ''),
-                    " ".join(exam.get('risks', []))
-                ]
-                site_content.append({'type': 'examen', 'title': exam['title'], 'url': f"/examens/{exam['slug']}", 'keywords': " ".join(keywords)})
-            
-            for path in PATHOLOGIES:
-                keywords = [
-                    path['title'],
-                    path.get('summary', ''),
-                    " ".join(path.get('symptoms', [])),
-                    " ".join(path.get('tags', [])),
-                    " ".join(path.get('treatments', [])),
-                    " ".join(path.get('advice', [])),
-                    " ".join(path.get('prevention', [])),
-                    " ".join(path.get('exams', []))
-                ]
-                site_content.append({'type': 'pathologie', 'title': path['title'], 'url': f"/pathologies/{path['slug']}", 'keywords': " ".join(keywords)})
-            
-            for guide in GUIDES:
-                keywords = [
-                    guide['title'],
-                    guide.get('summary', ''),
-                    " ".join(guide.get('steps', []))
-                ]
-                site_content.append({'type': 'guide', 'title': guide['title'], 'url': f"/guides/#{guide['slug']}", 'keywords': " ".join(keywords)})
-            
-            for post in BlogPost.objects.published():
-                keywords = " ".join(
-                    [
-                        post.title_fr,
-                        post.excerpt_fr,
-                        post.content_fr,
-                    ]
-                )
-                site_content.append(
-                    {
-                        'type': 'article',
-                        'title': post.title_display,
-                        'url': post.get_absolute_url(),
-                        'keywords': keywords,
-                    }
-                )
+            logger.debug("Chatbot received: %s", raw_message)
 
-            # Add PDF documents from RAG folder
-            pdf_docs = load_pdf_content()
-            site_content.extend(pdf_docs)
-
-            for item in site_content:
-                content_text = normalize_text(item['keywords'])
-                
-                # Reuse scoring logic (simplified)
-                user_words = user_message.split()
-                # Expand synonyms instead of replacing
-                expanded_words = set(user_words)
-                for w in user_words:
-                    if w in synonyms:
-                        expanded_words.add(synonyms[w])
-                user_words_set = expanded_words
-                
-                content_words = set(content_text.split())
-                
-                common_words = user_words_set.intersection(content_words)
-                meaningful_matches = [w for w in common_words if w not in stop_words and len(w) > 2]
-                score = len(meaningful_matches) * 10
-                
-                # Sequence match on title
-                seq_ratio = difflib.SequenceMatcher(None, normalize_text(user_message), normalize_text(item['title'])).ratio()
-                if seq_ratio > 0.6:
-                    score += seq_ratio * 25
-
-                if score > max_score:
-                    max_score = score
-                    best_match = f"Je vous suggère de consulter notre fiche {item['type']} sur '{item['title']}'. <br><a href='{item['url']}'>Cliquez ici pour voir la page</a>."
-
-            print(f"Best match score: {max_score}")
-
-            response_data = {}
-            
-            if best_match and max_score >= 5: # Minimum score threshold
-                response_data['response'] = best_match
-            elif best_match and max_score > 0:
-                 response_data['response'] = best_match
-            else:
-                # Fallback to contact info if no match
-                response_data['response'] = fallback_response
-
-            # Check if medical query to suggest OpenEvidence
-            medical_keywords = {
-                'maladie', 'traitement', 'symptome', 'douleur', 'cancer', 'examen', 'medicament', 'effets', 'risques',
-                'disease', 'treatment', 'symptom', 'pain', 'exam', 'drug', 'risk',
-                'enfermedad', 'tratamiento', 'sintoma', 'dolor', 'examen', 'riesgo',
-                'crohn', 'rch', 'rectocolite', 'hepatite', 'cirrhose', 'ulcere', 'polype', 'diverticule',
-                'coloscopie', 'gastroscopie', 'endoscopie'
-            }
-            
-            # Always suggest OpenEvidence for medical queries to allow complementary info
-            if any(kw in user_message for kw in medical_keywords):
-                response_data['suggest_openevidence'] = True
-                
-            return JsonResponse(response_data)
+            if data.get('stream'):
+                return chatbot_stream_response(chatbot_events(raw_message, request_type, results, timer, context))
+            response_data = _chatbot_request_answer(raw_message, request_type, results, timer, context)
+            with timer.stage('serialization'):
+                response = JsonResponse(response_data)
+            timer.finish(type=request_type)
+            return response
 
         except Exception as e:
-            print(e)
+            logger.exception("Chatbot error: %s", e)
             return JsonResponse({'response': "Une erreur est survenue."}, status=500)
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
+
+
+def _chatbot_request_answer(raw_message, request_type, results=0, timer=NULL_TIMER, context=None):
+    with timer.active(), timer.stage('index'):
+        index = get_index()
+    return chatbot_answer(raw_message, request_type, index, results, timer, context)
+
+
+@csrf_exempt
+async def chatbot_async_api(request):
+    """Async variant of ``chatbot_api`` for ASGI deployments (``CHATBOT_ASYNC``).
+
+    The scoring runs on the bounded chatbot thread pool, so a slow message
+    does not block the event loop serving the other requests; OpenEvidence
+    requests run on their own pool.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            raw_message = data.get('message', '')
+            request_type = type_option(data.get('type')) # 'normal' or 'openevidence'
+            results = results_option(data.get('results'))
+            context = context_option(data.get('context'))
+            timer = start_timer()
+
+            logger.debug("Chatbot received: %s", raw_message)
+
+            if data.get('stream'):
+                events = chatbot_events(raw_message, request_type, results, timer, context)
+                return chatbot_stream_response(_aiter_in_executor(events, request_executor(request_type)))
+            response_data = await run_in_executor(
+                _chatbot_request_answer, raw_message, request_type, results, timer, context,
+                executor=request_executor(request_type),
+            )
+            with timer.stage('serialization'):
+                response = JsonResponse(response_data)
+            timer.finish(type=request_type)
+            return response
+
+        except Exception as e:
+            logger.exception("Chatbot error: %s", e)
+            return JsonResponse({'response': "Une erreur est survenue."}, status=500)
+
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+
+def chatbot_batch_api(request):
+    """Answer a list of messages in one request, in order, against a single index snapshot (staff only).
+
+    The body is ``{"messages": [...], "type": "normal", "results": 0}`` or a
+    bare JSON array; each message is a string or a ``{"message": ..., "type": ...}``
+    object. The request is authenticated by the staff session, so it needs
+    the CSRF token like any other form.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if isinstance(data, dict):
+        messages = data.get('messages')
+        default_type = type_option(data.get('type'))
+        results = results_option(data.get('results'))
+    else:
+        messages = data
+        default_type = 'normal'
+        results = 0
+    if not isinstance(messages, list):
+        return JsonResponse({'error': 'Expected a list of messages'}, status=400)
+
+    limit = getattr(settings, "CHATBOT_BATCH_LIMIT", 50)
+    if len(messages) > limit:
+        return JsonResponse({'error': f'At most {limit} messages per batch'}, status=400)
+
+    timer = start_timer()
+    try:
+        with timer.active(), timer.stage('index'):
+            index = get_index()
+        responses = []
+        for item in messages:
+            if isinstance(item, dict):
+                raw_message, request_type = item.get('message', ''), item.get('type', default_type)
+            else:
+                raw_message, request_type = item, default_type
+            if not isinstance(raw_message, str):
+                raw_message = ''
+            request_type = type_option(request_type, default_type)
+            # Staff evaluation runs, not patient questions: not logged
+            responses.append(chatbot_answer(raw_message, request_type, index, results, timer, record=False))
+    except Exception as e:
+        logger.exception("Chatbot error: %s", e)
+        return JsonResponse({'response': "Une erreur est survenue."}, status=500)
+
+    logger.debug("Chatbot batch: %s message(s)", len(responses))
+    with timer.stage('serialization'):
+        response = JsonResponse({'responses': responses})
+    timer.finish(type='batch', messages=len(responses))
+    return response
+
+
+def chatbot_stats(request):
+    """Index size, response cache counters, stage timing histograms, OpenEvidence backend and
+    query log state of this worker (staff only)."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    index = get_index()
+    query_log = get_query_log()
+    return JsonResponse({
+        'index': {'version': index.version, 'documents': len(index), 'vocabulary': index.vocabulary_size},
+        'cache': get_response_cache().stats(),
+        'timing': timing_histograms.snapshot(),
+        'openevidence': get_openevidence_backend().stats(),
+        'analytics': query_log.stats() if query_log is not None else None,
+    })